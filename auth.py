@@ -1,4 +1,3 @@
-import os
 import re
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -38,19 +37,6 @@ def verify_password(password: str, stored_hash: str) -> bool:
         return False
 
 
-def _get_dsn() -> str:
-    dsn = None
-    try:
-        dsn = st.secrets.get("SUPABASE_DB_DSN")
-    except Exception:
-        dsn = None
-    if not dsn:
-        dsn = os.environ.get("SUPABASE_DB_DSN")
-    if not dsn:
-        raise RuntimeError("SUPABASE_DB_DSN não configurado (Secrets ou env).")
-    return dsn
-
-
 def _lock_policy(failed_attempts: int):
     # 5 erros = lock 10min
     if failed_attempts >= 5:
@@ -58,19 +44,6 @@ def _lock_policy(failed_attempts: int):
     return False, None
 
 
-def _get_columns(conn, table: str) -> set[str]:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            select column_name
-            from information_schema.columns
-            where table_schema='public' and table_name=%s
-            """,
-            (table,),
-        )
-        return {r[0] for r in cur.fetchall()}
-
-
 def autenticar(login: str, senha: str):
     """
     SEMPRE retorna: (ok: bool, user: dict|None, msg: str)
@@ -88,13 +61,13 @@ def autenticar(login: str, senha: str):
         return False, None, "Informe a senha."
 
     try:
-        import psycopg
+        from db import get_conn, put_conn, table_columns
     except Exception as e:
         return False, None, f"psycopg não instalado no ambiente. Erro: {e}"
 
-    # Conecta
+    # Conexão do pool do app (já autenticada; sem TLS/login a cada tentativa)
     try:
-        conn = psycopg.connect(_get_dsn(), connect_timeout=10)
+        conn = get_conn()
     except Exception as e:
         return False, None, (
             "Falha ao conectar no Supabase. "
@@ -103,7 +76,7 @@ def autenticar(login: str, senha: str):
         )
 
     try:
-        cols = _get_columns(conn, "app_users")
+        cols = set(table_columns(conn, "app_users"))
         if not cols:
             return False, None, "Tabela public.app_users não encontrada (ou sem colunas)."
 
@@ -256,10 +229,7 @@ def autenticar(login: str, senha: str):
             pass
         return False, None, f"Erro ao consultar/validar usuário no Supabase: {e}"
     finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+        put_conn(conn)
 
 
 def is_admin() -> bool:
@@ -0,0 +1,292 @@
+# bench.py — micro-benchmarks do painel (rodar local, fora do Streamlit)
+#
+#   python bench.py loader --linhas 1000000 5000000
+#   python bench.py duracao --linhas 5000000
+#   python bench.py numero --linhas 1000000
+#   python bench.py texto
+#
+# "loader" precisa de SUPABASE_DB_DSN no env: cria uma tabela TEMP com o
+# formato da RAW (tudo texto) e outra com o da tipada (id numérico com zero
+# à esquerda e NULL, HH:MM:SS em texto) e compara pd.read_sql_query x COPY
+# TO STDOUT; na tipada confere que as colunas de texto chegam intactas.
+# "duracao" é local: .apply(tempo_para_segundos) x tempo_para_segundos_serie (únicos).
+# "numero" é local: conversão PT-BR de antes (_to_float_ptbr/_to_int_ptbr,
+# copiadas aqui como referência) x numero_ptbr_serie, em contador e decimal.
+# "texto" é local: confere que o parse do CSV da RAW devolve o texto intacto.
+#
+# Memória = pico de RSS durante a chamada (amostrado numa thread), não
+# tracemalloc: alocação do Arrow/pyarrow não passa pelo malloc do Python.
+import argparse
+import re
+import gc
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg
+
+from db import get_dsn
+from data_loader import _COLUNAS_RAW, _COLUNAS_TEXTO, _ler_csv, _ler_via_copy, _ler_via_read_sql
+from utils import numero_ptbr_serie, tempo_para_segundos, tempo_para_segundos_serie
+
+
+_SQL_BENCH_RAW = """
+create temp table bench_raw as
+select
+  (g / 5000 + 1)::bigint as import_id,
+  g::bigint as row_number,
+  (date '2024-01-01' + (g %% 700))::text as data_do_periodo,
+  (array['MANHA', 'TARDE', 'NOITE'])[1 + g %% 3] as periodo,
+  '04:00:00'::text as duracao_do_periodo,
+  (g %% 40)::text as numero_minimo_de_entregadores_regulares_na_escala,
+  (array['REGULAR', 'LIVRE'])[1 + g %% 2] as tag,
+  md5((g %% 3000)::text) as id_da_pessoa_entregadora,
+  'Entregador ' || (g %% 3000) as pessoa_entregadora,
+  'SAO PAULO'::text as praca,
+  (array['CENTRO', 'ZONA SUL', 'ZONA LESTE', null])[1 + g %% 4] as sub_praca,
+  'app'::text as origem,
+  replace(((g %% 10000) / 100.0)::text, '.', ',') as tempo_disponivel_escalado,
+  to_char(make_interval(secs => g %% 20000), 'HH24:MI:SS') as tempo_disponivel_absoluto,
+  (g %% 30)::text as numero_de_corridas_ofertadas,
+  (g %% 25)::text as numero_de_corridas_aceitas,
+  (g %% 5)::text as numero_de_corridas_rejeitadas,
+  (g %% 24)::text as numero_de_corridas_completadas,
+  (g %% 2)::text as numero_de_corridas_canceladas_pela_pessoa_entregadora,
+  (g %% 24)::text as numero_de_pedidos_aceitos_e_concluidos,
+  replace(((g %% 9000) / 10.0)::text, '.', ',') as soma_das_taxas_das_corridas_aceitas
+from generate_series(1, %s) g
+"""
+
+# formato da tipada (colunas da RAW com número/data já tipados)
+_SQL_BENCH_CLEAN = """
+create temp table bench_clean as
+select
+  import_id, row_number,
+  data_do_periodo::date as data_do_periodo,
+  periodo, duracao_do_periodo,
+  numero_minimo_de_entregadores_regulares_na_escala::double precision
+    as numero_minimo_de_entregadores_regulares_na_escala,
+  tag,
+  nullif(lpad((row_number % 3000)::text, 6, '0'), '000000') as id_da_pessoa_entregadora,
+  pessoa_entregadora, praca, sub_praca, origem,
+  replace(tempo_disponivel_escalado, ',', '.')::double precision as tempo_disponivel_escalado,
+  tempo_disponivel_absoluto,
+  numero_de_corridas_ofertadas::integer as numero_de_corridas_ofertadas,
+  numero_de_corridas_aceitas::integer as numero_de_corridas_aceitas,
+  numero_de_corridas_rejeitadas::integer as numero_de_corridas_rejeitadas,
+  numero_de_corridas_completadas::integer as numero_de_corridas_completadas,
+  numero_de_corridas_canceladas_pela_pessoa_entregadora::integer
+    as numero_de_corridas_canceladas_pela_pessoa_entregadora,
+  numero_de_pedidos_aceitos_e_concluidos::integer as numero_de_pedidos_aceitos_e_concluidos,
+  replace(soma_das_taxas_das_corridas_aceitas, ',', '.')::double precision
+    as soma_das_taxas_das_corridas_aceitas
+from bench_raw
+"""
+
+
+def _rss() -> int:
+    """RSS atual do processo em bytes (Linux: /proc/self/statm)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _medir(fn, *args, **kwargs):
+    """(resultado, segundos, pico de RSS acima do início em bytes)."""
+    gc.collect()
+    base = _rss()
+    pico = [base]
+    parar = threading.Event()
+
+    def _amostrar():
+        while not parar.is_set():
+            pico[0] = max(pico[0], _rss())
+            time.sleep(0.005)
+
+    t = threading.Thread(target=_amostrar, daemon=True)
+    t.start()
+    t0 = time.perf_counter()
+    try:
+        out = fn(*args, **kwargs)
+    finally:
+        dt = time.perf_counter() - t0
+        parar.set()
+        t.join()
+    pico[0] = max(pico[0], _rss())
+    return out, dt, pico[0] - base
+
+
+def bench_loader(linhas: list[int]):
+    sql = f"select {', '.join(_COLUNAS_RAW)} from bench_raw"
+
+    with psycopg.connect(get_dsn(), connect_timeout=10) as conn:
+        for n in linhas:
+            with conn.cursor() as cur:
+                cur.execute("drop table if exists bench_raw")
+                cur.execute(_SQL_BENCH_RAW, (int(n),))
+
+            print(f"\n== {n:,} linhas")
+            for nome, fn, kw in (
+                ("read_sql_query", _ler_via_read_sql, {}),
+                ("COPY TO STDOUT", _ler_via_copy, {"texto": True}),
+            ):
+                df, dt, pico = _medir(fn, conn, sql, **kw)
+                print(f"{nome:<16} {dt:8.2f}s  pico {pico / 2**20:9.1f} MiB  ({len(df):,} linhas)")
+                del df
+
+            with conn.cursor() as cur:
+                cur.execute("drop table if exists bench_clean")
+                cur.execute(_SQL_BENCH_CLEAN)
+            print("-- tipada")
+            sql_clean = f"select {', '.join(_COLUNAS_RAW)} from bench_clean"
+            ref, dt, pico = _medir(_ler_via_read_sql, conn, sql_clean)
+            print(f"{'read_sql_query':<16} {dt:8.2f}s  pico {pico / 2**20:9.1f} MiB  ({len(ref):,} linhas)")
+            df, dt, pico = _medir(_ler_via_copy, conn, sql_clean)
+            print(f"{'COPY TO STDOUT':<16} {dt:8.2f}s  pico {pico / 2**20:9.1f} MiB  ({len(df):,} linhas)")
+            textos = [c for c in _COLUNAS_TEXTO if c in ref.columns]
+            intacto = all(ref[c].fillna("").astype(str).equals(df[c].fillna("").astype(str)) for c in textos)
+            print(f"texto intacto: {intacto}  ({', '.join(textos)})")
+            del ref, df
+
+
+def _duracoes_sinteticas(n: int, seed: int = 42) -> pd.Series:
+    """Mistura dos formatos que aparecem na base: HH:MM:SS, HH:MM, segundos, sinal, vazio."""
+    rng = np.random.default_rng(seed)
+    seg = rng.integers(0, 20000, n)
+    hh, mm, ss = seg // 3600, (seg % 3600) // 60, seg % 60
+    hms = pd.Series([f"{h:02d}:{m:02d}:{x:02d}" for h, m, x in zip(hh, mm, ss)], dtype=object)
+
+    tipo = rng.integers(0, 100, n)
+    out = hms.copy()
+    out[tipo < 10] = pd.Series(seg.astype(str))[tipo < 10]              # segundos puros
+    out[(tipo >= 10) & (tipo < 15)] = hms.str[:5][(tipo >= 10) & (tipo < 15)]  # HH:MM
+    out[(tipo >= 15) & (tipo < 20)] = "-00:10:00"                       # sentinela
+    out[(tipo >= 20) & (tipo < 22)] = ""
+    out[(tipo >= 22) & (tipo < 23)] = None
+    return out
+
+
+def bench_duracao(linhas: list[int]):
+    for n in linhas:
+        s = _duracoes_sinteticas(n)
+        print(f"\n== {n:,} linhas")
+
+        antigo, dt_a, pico_a = _medir(lambda x: x.apply(tempo_para_segundos), s)
+        print(f"{'apply (escalar)':<16} {dt_a:8.2f}s  pico {pico_a / 2**20:9.1f} MiB")
+
+        novo, dt_n, pico_n = _medir(tempo_para_segundos_serie, s)
+        print(f"{'serie (únicos)':<16} {dt_n:8.2f}s  pico {pico_n / 2**20:9.1f} MiB")
+
+        iguais = bool((antigo.astype("int64").to_numpy() == novo.to_numpy()).all())
+        print(f"speedup {dt_a / max(dt_n, 1e-9):.1f}x  resultados iguais: {iguais}")
+        del s, antigo, novo
+
+
+# conversão PT-BR do data_loader antes do numero_ptbr_serie (referência)
+_RE_MILHAR_DEC = re.compile(r"^\d{1,3}(\.\d{3})+,\d+$")  # 4.118,10
+_RE_SO_DEC = re.compile(r"^\d+,\d+$")                 # 12,5
+_RE_SO_MILHAR = re.compile(r"^\d{1,3}(\.\d{3})+$")     # 1.234
+
+
+def _to_float_ptbr(series: pd.Series) -> pd.Series:
+    s = series.astype("string").str.strip()
+    s = s.replace({"": pd.NA, "nan": pd.NA, "NaN": pd.NA})
+    for rx, trocar in (
+        (_RE_MILHAR_DEC, lambda x: x.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)),
+        (_RE_SO_DEC, lambda x: x.str.replace(",", ".", regex=False)),
+        (_RE_SO_MILHAR, lambda x: x.str.replace(".", "", regex=False)),
+    ):
+        m = s.str.match(rx)
+        if m.any():
+            s = s.where(~m, trocar(s))
+    return pd.to_numeric(s, errors="coerce").fillna(0)
+
+
+def _to_int_ptbr(series: pd.Series) -> pd.Series:
+    s = series.astype("string").str.strip().replace({"": pd.NA})
+    s = s.str.replace(".", "", regex=False)
+    return pd.to_numeric(s, errors="coerce").fillna(0).astype(int)
+
+
+def _numeros_sinteticos(n: int, seed: int = 42) -> dict:
+    """Como vem da RAW: contador ('0'..'40', vazio) e decimal PT-BR ('12,5', '4.118,10', vazio)."""
+    rng = np.random.default_rng(seed)
+    cont = pd.Series(rng.integers(0, 41, n).astype(str), dtype=object)
+    cont[rng.integers(0, 100, n) < 3] = ""
+    cent = rng.integers(0, 1_000_000, n)
+    dec = pd.Series([f"{c // 100:,}".replace(",", ".") + f",{c % 100:02d}" for c in cent], dtype=object)
+    dec[rng.integers(0, 100, n) < 3] = None
+    return {"contador": (cont, _to_int_ptbr), "decimal": (dec, _to_float_ptbr)}
+
+
+def bench_numero(linhas: list[int]):
+    for n in linhas:
+        print(f"\n== {n:,} linhas")
+        for nome, (s, antigo_fn) in _numeros_sinteticos(n).items():
+            antigo, dt_a, pico_a = _medir(antigo_fn, s)
+            novo, dt_n, pico_n = _medir(numero_ptbr_serie, s)
+            iguais = bool(np.allclose(antigo.to_numpy(dtype="float64"), novo.to_numpy()))
+            print(
+                f"{nome:<9} antes {dt_a:6.2f}s pico {pico_a / 2**20:7.1f} MiB | "
+                f"agora {dt_n:6.2f}s pico {pico_n / 2**20:7.1f} MiB | "
+                f"speedup {dt_a / max(dt_n, 1e-9):.1f}x  iguais: {iguais}"
+            )
+            del antigo, novo
+
+
+def checar_texto():
+    """Texto da RAW tem que sair do parse exatamente como está no banco."""
+    csv_copy = (
+        "import_id,numero_de_corridas_ofertadas,tempo_disponivel_escalado,sub_praca\n"
+        '1,1.230,"2",\n'
+        '2,,"12,5",\n'
+        '3,2,"",CENTRO\n'
+    ).encode("utf-8")
+    df = _ler_csv(io.BytesIO(csv_copy), texto=True)
+
+    esperado = {
+        "import_id": ["1", "2", "3"],
+        "numero_de_corridas_ofertadas": ["1.230", None, "2"],
+        "tempo_disponivel_escalado": ["2", "12,5", None],
+        "sub_praca": [None, None, "CENTRO"],
+    }
+    ok = True
+    for col, valores in esperado.items():
+        obtido = [None if pd.isna(v) else v for v in df[col].tolist()]
+        igual = obtido == valores
+        ok &= igual
+        print(f"{col:<32} {'ok' if igual else 'ERRO'}  {obtido}")
+    if not ok:
+        raise SystemExit(1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks do painel")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_loader = sub.add_parser("loader", help="read_sql_query x COPY TO STDOUT (precisa de DSN)")
+    p_loader.add_argument("--linhas", type=int, nargs="+", default=[1_000_000, 5_000_000])
+
+    p_dur = sub.add_parser("duracao", help="apply(tempo_para_segundos) x vetorizado (local)")
+    p_dur.add_argument("--linhas", type=int, nargs="+", default=[5_000_000])
+
+    p_num = sub.add_parser("numero", help="_to_float/_to_int_ptbr (antes) x numero_ptbr_serie (local)")
+    p_num.add_argument("--linhas", type=int, nargs="+", default=[1_000_000])
+
+    sub.add_parser("texto", help="parse do CSV da RAW preserva o texto ('1.230', '2', vazio)")
+
+    args = ap.parse_args()
+    if args.cmd == "loader":
+        bench_loader(args.linhas)
+    elif args.cmd == "duracao":
+        bench_duracao(args.linhas)
+    elif args.cmd == "numero":
+        bench_numero(args.linhas)
+    elif args.cmd == "texto":
+        checar_texto()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,364 @@
 # data_loader.py (Supabase-only)
 import os
-import re
+import csv
+import json
+import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-from utils import normalizar, tempo_para_segundos
+from utils import coluna_nome_normalizado, normalizar_nome, normalizar_serie, numero_ptbr_serie, tempo_para_segundos_serie
+from shared import apply_sub_filter, sub_options_with_livre
+from db import RAW_TABLE, CLEAN_TABLE, DAILY_TABLE, db_conn
+
+# A base fica uma vez só por processo (_base_incremental) e é entregue às
+# telas sem cópia. Com copy-on-write, qualquer alteração numa tela copia só
+# a coluna mexida e nunca respinga na base compartilhada.
+pd.set_option("mode.copy_on_write", True)
+
+_log = logging.getLogger(__name__)
 
 SHEET = "Base 2025"  # não usado mais, mas deixo pra não quebrar import antigo
 
-_RE_MILHAR_DEC = re.compile(r"^\d{1,3}(\.\d{3})+,\d+$")  # 4.118,10
-_RE_SO_DEC     = re.compile(r"^\d+,\d+$")               # 12,5
-_RE_SO_MILHAR  = re.compile(r"^\d{1,3}(\.\d{3})+$")     # 1.234
+_COLUNAS_RAW = [
+    "import_id",
+    "row_number",
+    "data_do_periodo",
+    "periodo",
+    "duracao_do_periodo",
+    "numero_minimo_de_entregadores_regulares_na_escala",
+    "tag",
+    "id_da_pessoa_entregadora",
+    "pessoa_entregadora",
+    "praca",
+    "sub_praca",
+    "origem",
+    "tempo_disponivel_escalado",
+    "tempo_disponivel_absoluto",
+    "numero_de_corridas_ofertadas",
+    "numero_de_corridas_aceitas",
+    "numero_de_corridas_rejeitadas",
+    "numero_de_corridas_completadas",
+    "numero_de_corridas_canceladas_pela_pessoa_entregadora",
+    "numero_de_pedidos_aceitos_e_concluidos",
+    "soma_das_taxas_das_corridas_aceitas",
+]
+
+# grupos opcionais: colunas largas/pouco usadas que só sobem pra memória
+# quando alguma página pede.
+#
+# Contrato com as views: o resto de _COLUNAS_RAW + as derivadas do
+# pós-processamento (data, mes, ano, mes_ano, uuid, normalizado,
+# segundos_abs...) vêm sempre. A view só declara os grupos opcionais que lê:
+#   GRUPOS = ("escala",)   -> base + escala
+#   GRUPOS = ()            -> só a base
+#   (sem GRUPOS)           -> tudo
+# O main.py repassa GRUPOS pro carregar_dados; página com CARREGA_BASE = False
+# repassa pro carregar_periodo/carregar_mes.
+GRUPOS_COLUNAS = {
+    "escala": [
+        "numero_minimo_de_entregadores_regulares_na_escala",
+        "tag",
+        "duracao_do_periodo",
+    ],
+    "extras": [
+        "origem",
+        "numero_de_corridas_canceladas_pela_pessoa_entregadora",
+        "soma_das_taxas_das_corridas_aceitas",
+    ],
+}
+_COLUNAS_OPCIONAIS = {c for cols in GRUPOS_COLUNAS.values() for c in cols}
+_CHAVE = ["import_id", "row_number"]
+
 
-def _to_float_ptbr(series: pd.Series) -> pd.Series:
-    s = series.astype("string").str.strip()
-    s = s.replace({"": pd.NA, "nan": pd.NA, "NaN": pd.NA})
+def grupos_para(grupos) -> set[str]:
+    """Grupos opcionais pedidos (None = todos). Nome que não existe é erro de programação."""
+    if grupos is None:
+        return set(GRUPOS_COLUNAS)
+    pedidos = set(grupos)
+    desconhecidos = pedidos - set(GRUPOS_COLUNAS)
+    if desconhecidos:
+        raise ValueError(f"grupo(s) de colunas desconhecido(s): {sorted(desconhecidos)}")
+    return pedidos
 
-    m = s.str.match(_RE_MILHAR_DEC)
-    if m.any():
-        s = s.where(~m, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
 
-    m = s.str.match(_RE_SO_DEC)
-    if m.any():
-        s = s.where(~m, s.str.replace(",", ".", regex=False))
+def _colunas_select(tabela: str, grupos) -> list[str]:
+    """Colunas do SELECT: grupo base (sempre) + grupos opcionais, na ordem da RAW."""
+    extras = {c for g in grupos for c in GRUPOS_COLUNAS[g]}
+    colunas = [c for c in _COLUNAS_RAW if c not in _COLUNAS_OPCIONAIS or c in extras]
+    if tabela == CLEAN_TABLE:
+        colunas.append("segundos_abs_raw")
+    return colunas
 
-    m = s.str.match(_RE_SO_MILHAR)
-    if m.any():
-        s = s.where(~m, s.str.replace(".", "", regex=False))
 
-    return pd.to_numeric(s, errors="coerce").fillna(0)
+def _grupos_presentes(df: pd.DataFrame) -> set[str]:
+    return {g for g, cols in GRUPOS_COLUNAS.items() if set(cols) <= set(df.columns)}
 
-def _to_int_ptbr(series: pd.Series) -> pd.Series:
-    s = series.astype("string").str.strip().replace({"": pd.NA})
-    s = s.str.replace(".", "", regex=False)  # remove milhar
-    return pd.to_numeric(s, errors="coerce").fillna(0).astype(int)
 
-@st.cache_data(show_spinner=False)
-def carregar_dados(prefer_drive: bool = False, _ts: float | None = None):
+@contextmanager
+def _connect():
+    """Conexão emprestada do pool do app (db.db_conn); sem conexão vira st.error."""
+    with ExitStack() as pilha:
+        try:
+            conn = pilha.enter_context(db_conn())
+        except Exception as e:
+            st.error(f"❌ Falha ao ler Supabase: {e}")
+            st.stop()
+        yield conn
+
+
+def _tabela_fonte(conn) -> str:
+    """Tabela tipada (populada no import) quando existir; senão a RAW (texto)."""
+    with conn.cursor() as cur:
+        cur.execute("select to_regclass(%s)", (f"public.{CLEAN_TABLE}",))
+        existe = cur.fetchone()[0] is not None
+    return CLEAN_TABLE if existe else RAW_TABLE
+
+
+def _versao_db(conn, tabela: str) -> tuple[int, int]:
     """
-    Agora é Supabase-only.
-    prefer_drive ficou só pra compatibilidade com o main.py (ignorado).
-    _ts serve pra quebrar cache quando você aperta atualizar.
+    Versão da base no banco: (maior import_id na tabela-fonte, qtd de imports).
+    Nada de count(*) na RAW: o max sai do índice (import_id, row_number) e a
+    contagem é da tabela imports (1 linha por arquivo). Import apagado
+    aparece como qtd de imports que não bate com o que está em memória.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            select (select coalesce(max(import_id), 0) from public.{tabela}),
+                   (select count(*) from public.imports)
+            """
+        )
+        max_id, imports = cur.fetchone()
+    return int(max_id or 0), int(imports or 0)
+
+
+def _sql_base(tabela: str, colunas: list[str], where: str) -> str:
+    # import apagado de imports não volta, nem se a tipada ainda não foi podada
+    # (db.podar_imports_apagados roda no bootstrap e no upload)
+    return f"""
+      select
+        {", ".join(colunas)}
+      from public.{tabela}
+      where ({where})
+        and import_id in (select id from public.imports)
+    """
+
+
+def _ler_via_read_sql(conn, sql: str) -> pd.DataFrame:
+    """Caminho antigo (tuplas Python linha a linha). Fica pro bench/fallback."""
+    return pd.read_sql_query(sql, conn)
+
+
+def _ler_via_copy(conn, sql: str, texto: bool = False) -> pd.DataFrame:
     """
-    dsn = None
+    Streama o resultado com COPY ... TO STDOUT (CSV) em chunks pra um buffer
+    de bytes e parseia em bloco (_ler_csv).
+    Não cria tupla Python por linha e o buffer é bem menor que as tuplas.
+
+    texto=True: todas as colunas como string (tabela RAW).
+    """
+    buf = tempfile.SpooledTemporaryFile(max_size=256 * 1024 * 1024)
     try:
-        dsn = st.secrets.get("SUPABASE_DB_DSN")
-    except Exception:
-        pass
-    dsn = dsn or os.getenv("SUPABASE_DB_DSN")
+        with conn.cursor() as cur:
+            with cur.copy(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)") as cp:
+                for chunk in cp:
+                    buf.write(chunk)
+        buf.seek(0)
+        return _ler_csv(buf, texto)
+    finally:
+        buf.close()
 
-    if not dsn:
-        st.error("❌ SUPABASE_DB_DSN não configurado (secrets/env).")
-        st.stop()
 
+def _ler_csv(buf, texto: bool = False) -> pd.DataFrame:
+    """
+    CSV do COPY (com header) -> DataFrame. Vazio/NULL vira NA.
+    texto=True: string pura, sem inferência nenhuma (tabela RAW).
+    texto=False: as colunas de _COLUNAS_TEXTO continuam string e só o resto
+    (números, datas) é inferido. Deixando o pyarrow inferir tudo, id com NULL
+    vira float ("123.0"), id com zero à esquerda perde o zero e "01:30:00"
+    vira datetime.time. O engine="pyarrow" do read_csv ignora dtype no parse
+    (infere e só depois converte: "1.230" -> "1.23", NULL -> "nan"), então
+    aqui o pyarrow é chamado direto com o tipo dessas colunas fixo em string.
+    """
     try:
-        import psycopg
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
     except Exception:
-        st.error("❌ psycopg não instalado no ambiente do app.")
-        st.stop()
+        pa = None
 
-    sql = """
-      select
-        import_id,
-        row_number,
-        data_do_periodo,
-        periodo,
-        duracao_do_periodo,
-        numero_minimo_de_entregadores_regulares_na_escala,
-        tag,
-        id_da_pessoa_entregadora,
-        pessoa_entregadora,
-        praca,
-        sub_praca,
-        origem,
-        tempo_disponivel_escalado,
-        tempo_disponivel_absoluto,
-        numero_de_corridas_ofertadas,
-        numero_de_corridas_aceitas,
-        numero_de_corridas_rejeitadas,
-        numero_de_corridas_completadas,
-        numero_de_corridas_canceladas_pela_pessoa_entregadora,
-        numero_de_pedidos_aceitos_e_concluidos,
-        soma_das_taxas_das_corridas_aceitas
-      from base_2025_raw
-    """
+    inicio = buf.tell()
+    nomes = next(csv.reader([buf.readline().decode("utf-8")]), [])
+    buf.seek(inicio)
+    textos = [c for c in nomes if texto or c in _COLUNAS_TEXTO]
 
+    if pa is None:
+        return pd.read_csv(
+            buf,
+            engine="c",
+            dtype={c: str for c in textos},
+            keep_default_na=False,
+            na_values=[""],
+        )
+
+    tabela = pa_csv.read_csv(
+        buf,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in textos},
+            null_values=[""],
+            strings_can_be_null=True,
+        ),
+    )
+    return tabela.to_pandas()
+
+
+def _ler_base(conn, tabela: str, colunas: list[str], where: str) -> pd.DataFrame:
+    """Lê `colunas` da tabela-fonte com o filtro `where` (SQL já montado, sem params)."""
+    sql = _sql_base(tabela, colunas, where)
     try:
-        with psycopg.connect(dsn) as conn:
-            df = pd.read_sql_query(sql, conn)
+        df = _ler_via_copy(conn, sql, texto=(tabela == RAW_TABLE))
+        for c in _CHAVE:
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype("int64")
+        return df
     except Exception as e:
         st.error(f"❌ Falha ao ler Supabase: {e}")
         st.stop()
 
+
+def _anexar_grupos(conn, tabela: str, df: pd.DataFrame, grupos, max_import_id: int) -> pd.DataFrame:
+    """Busca só as colunas dos grupos novos (até max_import_id) e junta pela chave."""
+    colunas = _CHAVE + [c for g in sorted(grupos) for c in GRUPOS_COLUNAS[g]]
+    extra = _ler_base(conn, tabela, colunas, f"import_id <= {int(max_import_id)}")
+    if tabela == RAW_TABLE:
+        extra = _tipar_numericos(extra)
+    extra = _compactar(extra)
+    return df.merge(extra, on=_CHAVE, how="left")
+
+
+# ---- dtypes compactos (o df fica residente em cada worker) ----
+# texto com muita repetição -> string do pyarrow (sem objeto python por célula).
+# Não uso category de propósito: groupby com várias chaves categóricas gera o
+# produto cartesiano das categorias (observed=False) e várias telas fazem isso.
+_COLUNAS_TEXTO = [
+    "pessoa_entregadora",
+    "pessoa_entregadora_normalizado",
+    "uuid",
+    "id_da_pessoa_entregadora",
+    "praca",
+    "sub_praca",
+    "periodo",
+    "duracao_do_periodo",
+    "tag",
+    "origem",
+    "tempo_disponivel_absoluto",
+]
+
+# contadores / segundos cabem folgado em int32; mês e ano em int16
+_COLUNAS_INT = {
+    "import_id": "int32",
+    "row_number": "int32",
+    "numero_de_corridas_ofertadas": "int32",
+    "numero_de_corridas_aceitas": "int32",
+    "numero_de_corridas_rejeitadas": "int32",
+    "numero_de_corridas_completadas": "int32",
+    "numero_de_corridas_canceladas_pela_pessoa_entregadora": "int32",
+    "numero_de_pedidos_aceitos_e_concluidos": "int32",
+    "duracao_do_periodo_segundos": "int32",
+    "segundos_abs_raw": "int32",
+    "segundos_abs": "int32",
+    "mes": "int16",
+    "ano": "int16",
+}
+
+
+def _tipo_texto():
+    try:
+        import pyarrow  # noqa: F401
+        return "string[pyarrow]"
+    except Exception:
+        return None
+
+
+def _compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte texto pra string[pyarrow] e rebaixa inteiros (in place, idempotente)."""
+    tipo = _tipo_texto()
+    if tipo:
+        for c in _COLUNAS_TEXTO:
+            if c in df.columns and df[c].dtype == object:
+                df[c] = df[c].astype(tipo)
+
+    for c, tipo_int in _COLUNAS_INT.items():
+        if c not in df.columns:
+            continue
+        s = df[c]
+        # só mexe em inteiro "de verdade" (com NaN o pandas deixa float)
+        if pd.api.types.is_integer_dtype(s) and s.dtype != tipo_int:
+            df[c] = s.astype(tipo_int)
+    return df
+
+
+def relatorio_memoria() -> pd.DataFrame | None:
+    """
+    Memória por coluna da base compartilhada do processo (bytes reais, deep=True).
+    Não carrega nada: se a base ainda não está em memória, devolve None.
+    """
+    estado = _base_incremental()
+    with estado["lock"]:
+        df = estado["df"]
+    if df is None:
+        return None
+
+    uso = df.memory_usage(deep=True, index=False)
+    rel = pd.DataFrame({
+        "coluna": uso.index,
+        "dtype": [str(df[c].dtype) for c in uso.index],
+        "bytes": uso.values,
+    })
+    rel["MiB"] = (rel["bytes"] / (1024 * 1024)).round(2)
+    tot = rel["bytes"].sum()
+    rel["%"] = (rel["bytes"] / tot * 100).round(1) if tot else 0.0
+    return rel.sort_values("bytes", ascending=False, ignore_index=True)
+
+
+# numéricos da RAW (texto PT-BR) convertidos uma vez só, na carga
+_COLUNAS_FLOAT = [
+    "tempo_disponivel_escalado",
+    "numero_minimo_de_entregadores_regulares_na_escala",
+    "soma_das_taxas_das_corridas_aceitas",
+]
+_COLUNAS_CONTADOR = [
+    "numero_de_corridas_ofertadas",
+    "numero_de_corridas_aceitas",
+    "numero_de_corridas_rejeitadas",
+    "numero_de_corridas_completadas",
+    "numero_de_corridas_canceladas_pela_pessoa_entregadora",
+    "numero_de_pedidos_aceitos_e_concluidos",
+]
+
+
+def _tipar_numericos(df: pd.DataFrame) -> pd.DataFrame:
+    """Texto PT-BR -> número nas colunas presentes (grupos opcionais podem faltar)."""
+    for c in _COLUNAS_FLOAT:
+        if c in df.columns:
+            df[c] = numero_ptbr_serie(df[c])
+    for c in _COLUNAS_CONTADOR:
+        if c in df.columns:
+            df[c] = numero_ptbr_serie(df[c]).astype("int64")
+    return df
+
+
+def _pos_processar(df: pd.DataFrame, tipado: bool = False) -> pd.DataFrame:
+    """
+    tipado=True: df veio da tabela tipada (números/segundos já convertidos
+    no import), então só monta as colunas derivadas.
+    """
     # ---- pós-processamento igual ao Excel ----
     df["data_do_periodo"] = pd.to_datetime(df["data_do_periodo"], errors="coerce")
     df["data"] = df["data_do_periodo"].dt.date
@@ -98,32 +366,1032 @@ def carregar_dados(prefer_drive: bool = False, _ts: float | None = None):
     df["ano"] = df["data_do_periodo"].dt.year
     df["mes_ano"] = df["data_do_periodo"].dt.to_period("M").dt.to_timestamp()
 
-    df["pessoa_entregadora_normalizado"] = df["pessoa_entregadora"].apply(normalizar)
+    df["pessoa_entregadora_normalizado"] = normalizar_serie(df["pessoa_entregadora"])
 
     df["uuid"] = df["id_da_pessoa_entregadora"].astype(str)
 
     # tempo disponível absoluto -> segundos
-    s = df["tempo_disponivel_absoluto"]
-    td = pd.to_timedelta(s.astype(str).str.strip(), errors="coerce")
-    if td.notna().any():
-        df["segundos_abs_raw"] = td.dt.total_seconds().fillna(0).astype(int)
+    if tipado:
+        df["segundos_abs_raw"] = pd.to_numeric(df["segundos_abs_raw"], errors="coerce").fillna(0).astype(int)
     else:
-        df["segundos_abs_raw"] = s.apply(tempo_para_segundos).fillna(0).astype(int)
+        s = df["tempo_disponivel_absoluto"]
+        td = pd.to_timedelta(s.astype(str).str.strip(), errors="coerce")
+        if td.notna().any():
+            df["segundos_abs_raw"] = td.dt.total_seconds().fillna(0).astype(int)
+        else:
+            df["segundos_abs_raw"] = tempo_para_segundos_serie(s)
 
     df["segundos_negativos_flag"] = df["segundos_abs_raw"] < 0
     seg_raw = pd.to_numeric(df["segundos_abs_raw"], errors="coerce").fillna(0)
     df["segundos_abs"] = seg_raw.where(seg_raw >= 0, 0).astype(int)
 
-    # numéricos principais
-    df["tempo_disponivel_escalado"] = _to_float_ptbr(df["tempo_disponivel_escalado"])
+    if tipado:
+        return _compactar(df)
+
+    return _compactar(_tipar_numericos(df))
+
+
+# ---- snapshot local (Parquet) pra cold start ----
+_SNAPSHOT_DIR = os.getenv("PAINEL_SNAPSHOT_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache"
+)
+_SNAPSHOT_META_KEY = b"painel_versao"
+
+
+def _snapshot_path(tabela: str) -> str:
+    # um arquivo por tabela-fonte (RAW texto x tipada têm dtypes diferentes)
+    return os.path.join(_SNAPSHOT_DIR, f"{tabela}.parquet")
+
+
+def _ler_snapshot(tabela: str):
+    """
+    Lê o snapshot local da tabela-fonte, se existir e estiver íntegro.
+    Retorna (df, (max_import_id, imports)) ou (None, None).
+    """
+    try:
+        import pyarrow.parquet as pq
+    except Exception:
+        return None, None
+
+    path = _snapshot_path(tabela)
+    if not os.path.exists(path):
+        return None, None
+
+    try:
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {})[_SNAPSHOT_META_KEY])
+        versao = (int(meta["max_import_id"]), int(meta["imports"]))
+        linhas = int(meta["linhas"])
+        df = table.to_pandas()
+    except Exception:
+        return None, None
+
+    if len(df) != linhas:
+        return None, None
+    return df, versao
+
 
-    for c in [
-        "numero_de_corridas_ofertadas",
-        "numero_de_corridas_aceitas",
-        "numero_de_corridas_rejeitadas",
-        "numero_de_corridas_completadas",
-    ]:
-        df[c] = _to_int_ptbr(df[c])
+def _gravar_snapshot(df: pd.DataFrame, tabela: str, versao: tuple[int, int]) -> None:
+    """
+    Grava o df pós-processado + versão (max_import_id, imports) e a qtd de
+    linhas pra conferir na leitura (atômico via rename). Falha = só não grava.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except Exception:
+        return
+
+    try:
+        os.makedirs(_SNAPSHOT_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[_SNAPSHOT_META_KEY] = json.dumps(
+            {"max_import_id": int(versao[0]), "imports": int(versao[1]), "linhas": len(df)}
+        ).encode("utf-8")
+        table = table.replace_schema_metadata(meta)
+
+        path = _snapshot_path(tabela)
+        # pid + thread: duas gravações em background não disputam o mesmo tmp;
+        # snapshot mais velho vencendo é inofensivo (a versão vai junto)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+# de quanto em quanto tempo uma sessão dispara a conferência da versão no
+# banco (em background; quem pediu continua com a base atual)
+_REVALIDAR_SEG = 60
+
+
+class VersaoBase(NamedTuple):
+    """
+    Qual dado está sendo servido: muda quando chega/sai import. Serve de
+    chave pra todo cache derivado (ver derivado()).
+    """
+    tabela: str
+    max_import_id: int
+    linhas: int
+    ultima_data: pd.Timestamp | None
+
+
+def _versao_de(novo: dict) -> VersaoBase:
+    """Versão de um estado montado; a última data sai da última partição (sem varrer tudo)."""
+    df, particoes = novo["df"], novo["particoes"]
+    ultima = pd.NaT
+    if particoes:
+        a, b = particoes[max(particoes)]
+        ultima = df["data_do_periodo"].iloc[a:b].max()
+    return VersaoBase(
+        novo["tabela"],
+        int(novo["max_import_id"]),
+        len(df),
+        None if pd.isna(ultima) else pd.Timestamp(ultima),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _base_incremental() -> dict:
+    """
+    Base materializada do processo (compartilhada entre sessões).
+    max_import_id = maior import já pós-processado e anexado em df.
+    imports = qtd de imports no banco quando df foi montado (detecta apagado).
+    grupos = grupos opcionais de colunas já carregados em df.
+    particoes = mes_ano -> (ini, fim) em df, que fica ordenado por mes_ano:
+      cada mês (ou faixa de meses) é uma fatia contígua, sem cópia.
+    indice = entregador -> posições em df (montado sob demanda, por df).
+    versao = VersaoBase dos dados em df (None antes da 1ª carga).
+    lock = leitura/troca dos campos acima (rápido, nunca segura I/O).
+    carga = só um montando base nova por vez (segura o I/O).
+    pendente = pediram conferência (upload) com carga já rodando: quem
+      segura a carga confere de novo antes de soltar.
+    geracao = sobe a cada troca com dados novos (toast nas sessões).
+    erro = repr da última falha da recarga em background (None = ok).
+    """
+    return {
+        "df": None,
+        "tabela": None,
+        "max_import_id": 0,
+        "imports": 0,
+        "grupos": set(),
+        "particoes": {},
+        "indice": None,
+        "versao": None,
+        "lock": threading.Lock(),
+        "carga": threading.Lock(),
+        "pendente": False,
+        "geracao": 0,
+        "verificado_em": 0.0,
+        "erro": None,
+    }
+
+
+# ---- partições mensais (df ordenado por mes_ano + índice de faixas) ----
+def _ordenar_por_mes(df: pd.DataFrame) -> pd.DataFrame:
+    """Ordena por mes_ano (estável: dentro do mês fica a ordem de import)."""
+    if df["mes_ano"].is_monotonic_increasing:
+        return df
+    return df.sort_values("mes_ano", kind="stable", na_position="last", ignore_index=True)
+
+
+def _indice_meses(df: pd.DataFrame, inicio: int = 0) -> dict:
+    """mes_ano -> (ini, fim) das linhas df[inicio:] (df já ordenado)."""
+    m = df["mes_ano"].to_numpy()[inicio:]
+    validos = ~pd.isna(m)
+    chaves, ini = np.unique(m[validos], return_index=True)
+    fim = np.append(ini[1:], int(validos.sum()))
+    return {pd.Timestamp(k): (inicio + int(a), inicio + int(b)) for k, a, b in zip(chaves, ini, fim)}
+
+
+def _anexar_particionado(df: pd.DataFrame, particoes: dict, delta: pd.DataFrame):
+    """
+    Anexa o delta mantendo a ordem por mes_ano. Caso comum (import novo só
+    com meses >= último mês da base): só as partições tocadas são refeitas.
+    Import retroativo: reordena tudo e refaz o índice.
+    """
+    delta = _ordenar_por_mes(delta)
+    n = len(df)
+    ultimo = df["mes_ano"].iloc[-1] if n else pd.NaT
+    primeiro_delta = delta["mes_ano"].iloc[0]
+
+    novo = pd.concat([df, delta], ignore_index=True)
+    if n and (pd.isna(ultimo) or pd.isna(primeiro_delta) or primeiro_delta < ultimo):
+        novo = _ordenar_por_mes(novo)
+        return novo, _indice_meses(novo)
+
+    particoes = dict(particoes)
+    for mes, (a, b) in _indice_meses(novo, n).items():
+        # o último mês da base pode continuar no delta: emenda a faixa
+        a = particoes.get(mes, (a, b))[0]
+        particoes[mes] = (a, b)
+    return novo, particoes
+
+
+def _montar_base(atual: dict, grupos=()) -> dict | None:
+    """
+    Recebe uma foto do estado (df/tabela/max_import_id/imports/grupos),
+    confere a versão no banco (1 query barata) e devolve o estado novo, ou
+    None se nada mudou:
+      - processo frio: parte do snapshot local, se houver;
+      - busca só as colunas de grupos opcionais que ainda não estão em memória;
+      - traz só os imports novos (import_id > max_import_id), pós-processa
+        o delta e anexa;
+      - se a qtd de imports não bate (import apagado / snapshot velho),
+        recarrega tudo.
+    Não mexe no estado compartilhado: quem chama troca (_trocar_base).
+    "snapshot" no retorno = vale regravar o snapshot (recarga completa,
+    grupo novo ou processo frio que partiu de snapshot defasado); delta
+    de processo quente não regrava.
+    """
+    df, max_local, grupos_atuais = atual["df"], int(atual["max_import_id"]), set(atual["grupos"])
+    imports_local = int(atual["imports"])
+    particoes = atual["particoes"]
+
+    with _connect() as conn:
+        tabela = _tabela_fonte(conn)
+        tipado = tabela == CLEAN_TABLE
+        max_db, imports_db = _versao_db(conn, tabela)
+
+        mudou = False
+        do_snapshot = False
+        if atual["tabela"] != tabela:
+            # fonte mudou (tabela tipada criada): descarta o que tinha
+            df, max_local, imports_local, grupos_atuais = None, 0, 0, set()
+            mudou = True
+
+        if df is None:
+            snap, versao = _ler_snapshot(tabela)
+            if snap is not None:
+                df = _ordenar_por_mes(_compactar(snap))
+                particoes = _indice_meses(df)
+                max_local, imports_local = versao
+                grupos_atuais = _grupos_presentes(snap)
+                mudou = do_snapshot = True
 
+        grupos = set(grupos) | grupos_atuais
+        colunas = _colunas_select(tabela, grupos)
+
+        faltando = grupos - grupos_atuais
+        if df is not None and faltando:
+            df = _anexar_grupos(conn, tabela, df, faltando, max_local)
+
+        novo = {"tabela": tabela, "max_import_id": max_db, "imports": imports_db, "grupos": grupos}
+
+        if df is not None and max_db == max_local and imports_db == imports_local:
+            if not (mudou or faltando):
+                return None
+            # snapshot em dia: só regrava se ganhou colunas
+            return {**novo, "df": df, "particoes": particoes, "snapshot": bool(faltando)}
+
+        recarga = df is None or max_db <= max_local
+        if not recarga:
+            delta = _ler_base(conn, tabela, colunas, f"import_id > {max_local}")
+            novos = int(delta["import_id"].nunique())
+            if not delta.empty:
+                df, particoes = _anexar_particionado(df, particoes, _pos_processar(delta, tipado))
+            # imports novos + os que já tinha tem que dar o total do banco
+            recarga = imports_local + novos != imports_db
+
+        if recarga:
+            df = _ordenar_por_mes(_pos_processar(_ler_base(conn, tabela, colunas, "true"), tipado))
+            particoes = _indice_meses(df)
+
+    return {**novo, "df": df, "particoes": particoes, "snapshot": recarga or do_snapshot or bool(faltando)}
+
+
+def _gravar_snapshot_em_background(novo: dict) -> None:
+    """Regrava o snapshot numa thread depois da troca (df não muda mais: copy-on-write)."""
+    args = (novo["df"], novo["tabela"], (int(novo["max_import_id"]), int(novo["imports"])))
+    threading.Thread(target=_gravar_snapshot, args=args, name="painel-snapshot", daemon=True).start()
+
+
+def _trocar_base(estado: dict, novo: dict) -> None:
+    """Troca atômica: quem lê pega a base velha inteira ou a nova inteira."""
+    versao = _versao_de(novo)
+    with estado["lock"]:
+        mudou = estado["versao"] != versao
+        estado.update(novo)
+        estado["versao"] = versao
+        if mudou:
+            estado["geracao"] += 1
+    if mudou:
+        _limpar_derivados(versao)
+    _podar_cache_mes(novo["tabela"], (int(novo["max_import_id"]), int(novo["imports"])))
+
+
+def _recarregar(estado: dict, grupos=()) -> None:
+    """Monta a base nova fora do lock de leitura e troca. Chamar segurando estado["carga"]."""
+    # pedido que chegar daqui pra frente não é coberto por esta leitura do banco
+    estado["pendente"] = False
+    with estado["lock"]:
+        atual = {k: estado[k] for k in ("df", "tabela", "max_import_id", "imports", "grupos", "particoes")}
+    novo = _montar_base(atual, grupos)
+    estado["verificado_em"] = time.time()
+    if novo is not None:
+        snapshot = novo.pop("snapshot")
+        _trocar_base(estado, novo)
+        if snapshot:
+            _gravar_snapshot_em_background(novo)
+
+
+def _soltar_carga(estado: dict) -> None:
+    """Solta estado["carga"]; se pediram conferência enquanto estava presa, dispara outra."""
+    estado["carga"].release()
+    if estado["pendente"]:
+        _revalidar_em_background(estado)
+
+
+def _revalidar_em_background(estado: dict) -> None:
+    """
+    Stale-while-revalidate: confere/atualiza a base numa thread, enquanto
+    todas as sessões seguem servindo a versão atual. Se já tem carga
+    rodando, não faz nada aqui; com estado["pendente"] ligado, quem está
+    rodando confere de novo antes de terminar.
+    """
+    if not estado["carga"].acquire(blocking=False):
+        return
+
+    def _rodar():
+        try:
+            while True:
+                try:
+                    _recarregar(estado)
+                    estado["erro"] = None
+                except BaseException as e:  # st.stop() fora de sessão vira exceção aqui
+                    _log.exception("falha ao recarregar a base em background")
+                    estado["erro"] = repr(e)
+                    estado["verificado_em"] = time.time()
+                if not estado["pendente"]:
+                    break
+        finally:
+            _soltar_carga(estado)
+
+    threading.Thread(target=_rodar, name="painel-revalida", daemon=True).start()
+
+
+def _talvez_revalidar(estado: dict, forcar: bool = False) -> None:
+    if forcar or time.time() - estado["verificado_em"] > _REVALIDAR_SEG:
+        _revalidar_em_background(estado)
+
+
+def geracao_base() -> int:
+    """Contador de versões da base do processo (muda quando chegam dados novos)."""
+    return int(_base_incremental()["geracao"])
+
+
+def versao_base() -> VersaoBase | None:
+    """Versão dos dados servidos agora pela base do processo (None antes da 1ª carga)."""
+    return _base_incremental()["versao"]
+
+
+def erro_base() -> str | None:
+    """Última falha da recarga em background deste processo (None = ok)."""
+    return _base_incremental()["erro"]
+
+
+def invalidar_base() -> None:
+    """
+    Chamar depois de gravar no banco (upload): confere a versão e traz só o
+    que mudou, em background. Se já tem recarga rodando (talvez lendo o
+    banco de antes do upload), ela confere de novo ao terminar. Não apaga
+    nenhum outro cache do app.
+    """
+    estado = _base_incremental()
+    estado["verificado_em"] = 0.0
+    estado["pendente"] = True
+    _revalidar_em_background(estado)
+
+
+def carregar_dados(prefer_drive: bool = False, grupos=None, revalidar: bool = False):
+    """
+    Agora é Supabase-only, com carga incremental por import_id e
+    snapshot local pra não puxar a tabela toda a cada restart.
+    Devolve uma visão da base única do processo (copy-on-write), não uma
+    cópia por sessão: a tela pode alterar à vontade sem afetar as outras.
+    prefer_drive ficou só pra compatibilidade com o main.py (ignorado).
+    A base é chaveada pela versão do banco (max import_id, qtd de linhas):
+    revalidar=True confere já (em background, sem travar a tela); sem isso
+    confere sozinho a cada _REVALIDAR_SEG.
+    grupos: grupos opcionais da página (GRUPOS da view, ver GRUPOS_COLUNAS);
+    só esses são buscados/devolvidos além da base. None = tudo.
+    df.attrs["versao"] = VersaoBase dos dados (chave pros caches derivados).
+    """
+    grupos = grupos_para(grupos)
+    base, _, geracao = _garantir_base(grupos, revalidar)
+
+    df = _projetar(base, grupos)
     df.attrs["fonte"] = "supabase"
+    df.attrs["geracao"] = geracao
+    df.attrs["versao"] = versao_base()
     return df
+
+
+def _garantir_base(grupos: set, revalidar: bool = False):
+    """(df, particoes, geracao) da base do processo com os grupos pedidos."""
+    estado = _base_incremental()
+
+    with estado["lock"]:
+        pronta = estado["df"] is not None and grupos <= estado["grupos"]
+
+    if pronta:
+        _talvez_revalidar(estado, forcar=revalidar)
+    else:
+        # processo frio ou grupo novo: não tem o que servir, carrega na hora
+        estado["carga"].acquire()
+        try:
+            with estado["lock"]:
+                pronta = estado["df"] is not None and grupos <= estado["grupos"]
+            if not pronta:
+                _recarregar(estado, grupos)
+        finally:
+            _soltar_carga(estado)
+
+    with estado["lock"]:
+        return estado["df"], estado["particoes"], estado["geracao"]
+
+
+def _projetar(df: pd.DataFrame, grupos: set) -> pd.DataFrame:
+    """Tira as colunas dos grupos não pedidos. Sem .copy(): compartilha os dados (copy-on-write)."""
+    fora = {c for g in set(GRUPOS_COLUNAS) - grupos for c in GRUPOS_COLUNAS[g]}
+    out = df[[c for c in df.columns if c not in fora]]
+    if out.index is not df.index:
+        # mesmo objeto de índice = "é a base" pro linhas_entregador/catálogo
+        out.index = df.index
+    return out
+
+
+def _fatia_meses(df: pd.DataFrame, particoes: dict, inicio, fim) -> pd.DataFrame:
+    """Meses [inicio, fim] (inclusivo) como uma fatia contígua de df (ordenado)."""
+    ini = pd.Timestamp(inicio).to_period("M").to_timestamp()
+    fim = pd.Timestamp(fim).to_period("M").to_timestamp()
+    faixas = [v for k, v in particoes.items() if ini <= k <= fim]
+    if not faixas:
+        return df.iloc[0:0]
+    return df.iloc[min(a for a, _ in faixas):max(b for _, b in faixas)]
+
+
+# ---- índice por entregador (nome / normalizado / uuid -> posições) ----
+def _posicoes_por(serie: pd.Series) -> dict:
+    """valor -> posições (int32, crescentes) numa passada: factorize + argsort estável."""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    ordem = np.argsort(codigos, kind="stable").astype(np.int32)
+    ordem = ordem[int((codigos < 0).sum()):]  # nulos (-1) vêm primeiro
+    limites = np.concatenate([[0], np.cumsum(np.bincount(codigos[codigos >= 0], minlength=len(unicos)))])
+    return {u: ordem[limites[i]:limites[i + 1]] for i, u in enumerate(unicos)}
+
+
+def _eh_da_base(df: pd.DataFrame, estado: dict) -> bool:
+    """
+    df tem as mesmas linhas, na mesma ordem, da base atual? Confere pelo
+    objeto do índice (imutável): visão/cópia rasa/coluna nova compartilham;
+    filtro, sort, reset_index ou concat geram outro. Tamanho/geração não
+    bastam (frame reordenado passaria).
+    """
+    with estado["lock"]:
+        base = estado["df"]
+    return base is not None and df.index is base.index
+
+
+def _indice_entregadores(estado: dict) -> dict | None:
+    """Índice da base atual; monta na primeira busca depois de cada troca."""
+    with estado["lock"]:
+        base, idx = estado["df"], estado["indice"]
+    if base is None:
+        return None
+    if idx is not None and idx["df"] is base:
+        return idx
+
+    por_nome = _posicoes_por(base["pessoa_entregadora"])
+    por_norm: dict = {}
+    for nome in por_nome:
+        por_norm.setdefault(normalizar_nome(nome), []).append(nome)
+
+    idx = {
+        "df": base,
+        "nome": por_nome,
+        "norm": por_norm,
+        "uuid": _posicoes_por(base["uuid"]) if "uuid" in base.columns else {},
+    }
+    with estado["lock"]:
+        if estado["df"] is base:
+            estado["indice"] = idx
+    return idx
+
+
+def linhas_entregador(df: pd.DataFrame, nome=None, normalizado=None, uuid=None) -> pd.DataFrame:
+    """
+    Linhas de um entregador (por nome exato, nome normalizado ou uuid).
+    Se df é a base do carregar_dados (mesmo índice, ver _eh_da_base), usa o
+    índice do processo: fatia O(k). Senão, máscara normal.
+    """
+    estado = _base_incremental()
+    idx = _indice_entregadores(estado) if _eh_da_base(df, estado) else None
+    if idx is not None and df.index is idx["df"].index:
+        vazio = np.empty(0, dtype=np.int32)
+        if nome is not None:
+            pos = idx["nome"].get(nome, vazio)
+        elif uuid is not None:
+            pos = idx["uuid"].get(str(uuid), vazio)
+        else:
+            partes = [idx["nome"][n] for n in idx["norm"].get(normalizado, ())]
+            pos = np.sort(np.concatenate(partes)) if partes else vazio
+        return df.iloc[pos]
+
+    if nome is not None:
+        return df[df["pessoa_entregadora"] == nome]
+    if uuid is not None:
+        return df[df["uuid"].astype(str) == str(uuid)]
+    return df[coluna_nome_normalizado(df) == normalizado]
+
+
+# ---- cache de derivados por versão da base ----
+# Agregações/índices/exports calculados em cima da base ficam aqui, chaveados
+# por (nome, chave) e pela VersaoBase: quando a versão muda, some tudo de uma
+# vez (na troca da base), sem depender de tempo nem de st.cache_data.clear().
+_DERIVADOS_MAX = int(os.environ.get("PAINEL_DERIVADOS_MAX", "256"))
+
+
+@st.cache_resource(show_spinner=False)
+def _derivados() -> dict:
+    return {"versao": None, "itens": OrderedDict(), "lock": threading.Lock()}
+
+
+def _limpar_derivados(versao: VersaoBase | None = None) -> None:
+    reg = _derivados()
+    with reg["lock"]:
+        reg["versao"] = versao
+        reg["itens"].clear()
+
+
+def derivado(nome: str, chave, calcular, versao: VersaoBase | None = None):
+    """
+    calcular() em cache até a versão da base mudar.
+    nome identifica a conta (ex.: "indicadores.somas_mensais"), chave os
+    parâmetros (hashable). versao: a do df usado (df.attrs["versao"]);
+    None = a atual do processo. Sem versão conhecida, só calcula.
+    O valor é compartilhado entre sessões: não alterar o que voltar.
+    """
+    versao = versao if versao is not None else versao_base()
+    if versao is None:
+        return calcular()
+
+    reg = _derivados()
+    k = (nome, chave)
+    with reg["lock"]:
+        if reg["versao"] == versao and k in reg["itens"]:
+            reg["itens"].move_to_end(k)
+            return reg["itens"][k]
+
+    valor = calcular()
+
+    with reg["lock"]:
+        if reg["versao"] != versao:
+            # versão velha (sessão atrasada) não entra; versão nova zera o registro
+            if versao != versao_base():
+                return valor
+            reg["versao"] = versao
+            reg["itens"].clear()
+        reg["itens"][k] = valor
+        while len(reg["itens"]) > _DERIVADOS_MAX:
+            reg["itens"].popitem(last=False)
+    return valor
+
+
+# ---- catálogo de dimensões (opções dos filtros) ----
+COLUNAS_TURNO = ("turno", "tipo_turno", "periodo")
+
+
+def _unicos(df: pd.DataFrame, col: str) -> list:
+    if col not in df.columns:
+        return []
+    return sorted(df[col].dropna().unique().tolist())
+
+
+def _montar_catalogo(df: pd.DataFrame) -> dict:
+    """
+    Opções dos seletores a partir de valores únicos (nunca linha a linha):
+    entregadores, uuid por nome, conjunto de uuids normalizados, turnos
+    (por coluna), praças, subpraças com a regra do LIVRE, meses e anos.
+    """
+    uuid_por_nome: dict = {}
+    uuids: frozenset = frozenset()
+    if "uuid" in df.columns:
+        unicos = pd.Series(df["uuid"].dropna().unique(), dtype=object).astype(str).str.strip().str.lower()
+        uuids = frozenset(u for u in unicos if u)
+        if "pessoa_entregadora" in df.columns:
+            pares = df[["pessoa_entregadora", "uuid"]].dropna().drop_duplicates("pessoa_entregadora")
+            uuid_por_nome = dict(zip(pares["pessoa_entregadora"].tolist(), pares["uuid"].astype(str).tolist()))
+
+    # LIVRE depende só dos pares (praca, sub_praca): calcula sobre os únicos
+    cols_sub = [c for c in ("praca", "sub_praca") if c in df.columns]
+    sub_pracas = sub_options_with_livre(df[cols_sub].drop_duplicates(), praca_scope="SAO PAULO") if cols_sub else []
+
+    return {
+        "entregadores": _unicos(df, "pessoa_entregadora"),
+        "uuid_por_nome": uuid_por_nome,
+        "uuids": uuids,
+        "turnos": {c: _unicos(df, c) for c in COLUNAS_TURNO if c in df.columns},
+        "pracas": _unicos(df, "praca"),
+        "sub_pracas": sub_pracas,
+        "meses": _unicos(df, "mes_ano"),
+        "anos": sorted({int(a) for a in df["ano"].dropna().unique().tolist()}, reverse=True) if "ano" in df.columns else [],
+    }
+
+
+def catalogo_dimensoes(df: pd.DataFrame) -> dict:
+    """
+    Opções dos filtros de df. Se df é a base do carregar_dados (mesmo
+    índice, ver _eh_da_base), usa o catálogo do processo, montado uma
+    vez por versão da base (derivado). Senão, monta na hora (só valores únicos).
+    O catálogo do processo sai da própria base, não de df: mesmo índice não
+    quer dizer mesmas colunas (a tela pode ter trocado data/ano/mes antes).
+    Não alterar as listas devolvidas: são compartilhadas entre sessões.
+    """
+    estado = _base_incremental()
+    with estado["lock"]:
+        base, versao = estado["df"], estado["versao"]
+    if base is None or df.index is not base.index:
+        return _montar_catalogo(df)
+    return derivado("catalogo", (), lambda: _montar_catalogo(base), versao=versao)
+
+
+# ---- leitura por período (predicate pushdown, cache por mês) ----
+def _base_em_memoria(grupos=()):
+    """
+    (df, tabela, versao, particoes) da base do processo se ela já estiver
+    carregada com os grupos pedidos; senão (None, tabela, versao, {}) lidos
+    do banco. versao = (max import_id, qtd de imports), como no _versao_db.
+    """
+    estado = _base_incremental()
+    with estado["lock"]:
+        if estado["df"] is not None and set(grupos) <= estado["grupos"]:
+            base, tabela = estado["df"], estado["tabela"]
+            versao = (int(estado["max_import_id"]), int(estado["imports"]))
+            particoes = estado["particoes"]
+        else:
+            base = None
+    if base is not None:
+        _talvez_revalidar(estado)
+        return base, tabela, versao, particoes
+
+    with _connect() as conn:
+        tabela = _tabela_fonte(conn)
+        return None, tabela, _versao_db(conn, tabela), {}
+
+
+def _meses_entre(inicio: date, fim: date) -> list[tuple[int, int]]:
+    meses = []
+    a, m = inicio.year, inicio.month
+    while (a, m) <= (fim.year, fim.month):
+        meses.append((a, m))
+        a, m = (a + 1, 1) if m == 12 else (a, m + 1)
+    return meses
+
+
+# partições mensais lidas do banco, compartilhadas pelo processo.
+# Chave sem a versão: quando a versão muda a entrada velha é trocada/podada
+# (nada de versão antiga ocupando memória até sair por LRU).
+_CACHE_MES_MAX_BYTES = int(os.environ.get("PAINEL_CACHE_MES_MB", "512")) * 1024 * 1024
+
+
+@st.cache_resource(show_spinner=False)
+def _cache_mes() -> dict:
+    return {"itens": OrderedDict(), "bytes": 0, "lock": threading.Lock()}
+
+
+def _tirar_do_cache(cache: dict, chave) -> None:
+    _, _, nbytes = cache["itens"].pop(chave)
+    cache["bytes"] -= nbytes
+
+
+def _podar_cache_mes(tabela: str, versao: tuple) -> None:
+    """Remove partições de versões superadas (ou de outra tabela-fonte; o cubo fica)."""
+    cache = _cache_mes()
+    with cache["lock"]:
+        for chave in [
+            k for k, (v, _, _) in cache["itens"].items()
+            if k[0] not in (tabela, DAILY_TABLE) or v != versao
+        ]:
+            _tirar_do_cache(cache, chave)
+
+
+def _ler_mes(tabela: str, ano: int, mes: int, praca: str | None, grupos: tuple) -> pd.DataFrame:
+    """
+    Uma partição mensal lida direto do banco (WHERE no data_do_periodo).
+    Na RAW a data é texto ISO, então a comparação de string funciona igual.
+    """
+    ini = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    where = f"data_do_periodo >= '{ini.isoformat()}' and data_do_periodo < '{fim.isoformat()}'"
+
+    with _connect() as conn:
+        if praca:
+            from psycopg import sql as pgsql
+            where += f" and praca = {pgsql.Literal(praca).as_string(conn)}"
+        df = _ler_base(conn, tabela, _colunas_select(tabela, grupos), where)
+
+    return _pos_processar(df, tabela == CLEAN_TABLE)
+
+
+def _mes_em_cache(chave: tuple, versao: tuple, ler) -> pd.DataFrame:
+    """
+    Cache por versão da base ((max import_id, qtd de imports)): chave[0] = tabela.
+    Versão nova -> relê (ler()) e substitui; passou do teto de memória ->
+    sai a menos usada (LRU).
+    """
+    cache = _cache_mes()
+
+    with cache["lock"]:
+        item = cache["itens"].get(chave)
+        if item is not None and item[0] == versao:
+            cache["itens"].move_to_end(chave)
+            return item[1]
+
+    if item is not None:
+        # versão mudou: aproveita e tira as outras partições superadas
+        _podar_cache_mes(chave[0], versao)
+
+    df = ler()
+    nbytes = int(df.memory_usage(deep=True).sum())
+
+    with cache["lock"]:
+        if chave in cache["itens"]:
+            _tirar_do_cache(cache, chave)
+        cache["itens"][chave] = (versao, df, nbytes)
+        cache["bytes"] += nbytes
+        while cache["bytes"] > _CACHE_MES_MAX_BYTES and len(cache["itens"]) > 1:
+            _tirar_do_cache(cache, next(iter(cache["itens"])))
+    return df
+
+
+def _carregar_mes(tabela: str, ano: int, mes: int, praca: str | None, grupos: tuple, versao: tuple) -> pd.DataFrame:
+    """Partição mensal da base com cache por versão."""
+    return _mes_em_cache(
+        (tabela, ano, mes, praca, grupos), versao,
+        lambda: _ler_mes(tabela, ano, mes, praca, grupos),
+    )
+
+
+def carregar_periodo(inicio, fim, praca: str | None = None, sub_pracas=None, grupos=None) -> pd.DataFrame:
+    """
+    Recorte [inicio, fim] (datas inclusivas) da base, pra páginas de escopo mensal.
+
+    - Base do processo já em memória: só fatia (zero I/O).
+    - Senão: empurra o intervalo (e a praça) pro WHERE no banco, mês a mês,
+      com cache por partição mensal + versão da base.
+    sub_pracas segue a regra do LIVRE (shared.apply_sub_filter).
+    grupos: como no carregar_dados.
+    """
+    ini = pd.Timestamp(inicio).normalize()
+    fim_ts = pd.Timestamp(fim).normalize()
+    grupos = grupos_para(grupos)
+
+    base, tabela, versao, particoes = _base_em_memoria(grupos)
+    if base is not None:
+        # só as partições dos meses do intervalo; o filtro de dia roda nelas
+        d = _fatia_meses(base, particoes, ini, fim_ts)
+        d = d[(d["data_do_periodo"] >= ini) & (d["data_do_periodo"] < fim_ts + pd.Timedelta(days=1))]
+        if praca:
+            d = d[d["praca"] == praca]
+    else:
+        chave_grupos = tuple(sorted(grupos))
+        partes = [
+            _carregar_mes(tabela, a, m, praca, chave_grupos, versao)
+            for a, m in _meses_entre(ini.date(), fim_ts.date())
+        ]
+        d = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=_colunas_select(tabela, grupos))
+        d = d[(d["data_do_periodo"] >= ini) & (d["data_do_periodo"] < fim_ts + pd.Timedelta(days=1))]
+
+    d = _projetar(d, grupos)
+
+    if sub_pracas:
+        d = apply_sub_filter(d, list(sub_pracas), praca_scope="SAO PAULO")
+    # sem .copy(): partição é compartilhada, copy-on-write protege
+    return d
+
+
+def carregar_mes(ano: int, mes: int, praca: str | None = None, sub_pracas=None, grupos=None) -> pd.DataFrame:
+    """Atalho do carregar_periodo pra um mês inteiro."""
+    ini = date(int(ano), int(mes), 1)
+    fim = (pd.Timestamp(ini) + pd.offsets.MonthEnd(1)).date()
+    return carregar_periodo(ini, fim, praca=praca, sub_pracas=sub_pracas, grupos=grupos)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _calendario_db(tabela: str, versao: tuple) -> tuple[list, str | None]:
+    """Meses com dados (1º dia, Timestamp) + último dia, sem puxar as linhas."""
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                select left(data_do_periodo::text, 7) as ym, max(data_do_periodo::text)
+                from public.{tabela}
+                where data_do_periodo is not null
+                  and import_id in (select id from public.imports)
+                group by 1
+                order by 1
+                """
+            )
+            rows = cur.fetchall()
+
+    meses = []
+    for ym, _ in rows:
+        ts = pd.to_datetime(f"{ym}-01", errors="coerce")
+        if pd.notna(ts):
+            meses.append(ts)
+    ultimo = max((r[1] for r in rows), default=None)
+    return meses, ultimo
+
+
+def meses_disponiveis() -> list:
+    """Meses (Timestamp no dia 1) que têm dados, em ordem crescente."""
+    base, tabela, versao, particoes = _base_em_memoria()
+    if base is not None:
+        return sorted(particoes)
+    return _calendario_db(tabela, versao)[0]
+
+
+def ultimo_dia():
+    """Último data_do_periodo da base (Timestamp ou NaT)."""
+    base, tabela, versao, _ = _base_em_memoria()
+    if base is not None:
+        v = versao_base()
+        return v.ultima_data if v is not None and v.ultima_data is not None else pd.NaT
+    return pd.to_datetime(_calendario_db(tabela, versao)[1], errors="coerce")
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _entregadores_db(tabela: str, versao: tuple) -> list[str]:
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                select distinct pessoa_entregadora
+                from public.{tabela}
+                where pessoa_entregadora is not null
+                  and import_id in (select id from public.imports)
+                """
+            )
+            return sorted(r[0] for r in cur.fetchall())
+
+
+def entregadores_disponiveis() -> list[str]:
+    """Nomes (pessoa_entregadora) distintos da base, ordenados."""
+    base, tabela, versao, _ = _base_em_memoria()
+    if base is not None:
+        return derivado("entregadores", (), lambda: sorted(base["pessoa_entregadora"].dropna().unique().tolist()))
+    return _entregadores_db(tabela, versao)
+
+
+# ---- cubo diário (data, turno, praça, subpraça, entregador) ----
+# Mantido no banco pelo upload (db.sync_daily_import). Páginas que só
+# precisam de somas por dia/turno/entregador leem o cubo, não as linhas.
+_DIM_CUBO = ["data", "periodo", "praca", "sub_praca", "pessoa_entregadora", "id_da_pessoa_entregadora"]
+_SOMAS_CUBO = [
+    "numero_de_corridas_ofertadas",
+    "numero_de_corridas_aceitas",
+    "numero_de_corridas_rejeitadas",
+    "numero_de_corridas_completadas",
+    "segundos_abs",
+]
+
+
+def _pos_processar_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """Mesmas colunas derivadas da base (data/mes/ano/mes_ano/uuid/normalizado)."""
+    df["data_do_periodo"] = pd.to_datetime(df["data"], errors="coerce")
+    df = df.sort_values("data_do_periodo", kind="stable", na_position="last", ignore_index=True)
+    df["data"] = df["data_do_periodo"].dt.date
+    df["mes"] = df["data_do_periodo"].dt.month
+    df["ano"] = df["data_do_periodo"].dt.year
+    df["mes_ano"] = df["data_do_periodo"].dt.to_period("M").dt.to_timestamp()
+    df["pessoa_entregadora_normalizado"] = normalizar_serie(df["pessoa_entregadora"])
+    df["uuid"] = df["id_da_pessoa_entregadora"].astype(str)
+    for c in _SOMAS_CUBO + ["linhas"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype("int64")
+    return _compactar(df)
+
+
+def _rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """Cubo calculado em memória (banco sem a tabela do cubo)."""
+    if df.empty:
+        return pd.DataFrame(columns=_DIM_CUBO + ["linhas"] + _SOMAS_CUBO)
+    g = df.assign(linhas=1).groupby(_DIM_CUBO, dropna=False, observed=True, sort=False)
+    return g[["linhas"] + _SOMAS_CUBO].sum().reset_index()
+
+
+def _ler_cubo_mes(ano: int, mes: int, praca: str | None) -> pd.DataFrame:
+    ini = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    cols = ", ".join(_DIM_CUBO + ["linhas"] + _SOMAS_CUBO)
+    where = f"data >= '{ini.isoformat()}' and data < '{fim.isoformat()}'"
+
+    with _connect() as conn:
+        if praca:
+            from psycopg import sql as pgsql
+            where += f" and praca = {pgsql.Literal(praca).as_string(conn)}"
+        try:
+            df = _ler_via_copy(conn, f"select {cols} from public.{DAILY_TABLE} where {where}")
+        except Exception as e:
+            st.error(f"❌ Falha ao ler cubo diário: {e}")
+            st.stop()
+    return _pos_processar_cubo(df)
+
+
+def _versao_cubo() -> tuple[bool, tuple[int, int]]:
+    """(cubo existe no banco?, versão = (max import_id da tipada, qtd de imports)); import apagado também muda."""
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute("select to_regclass(%s) is not null", (f"public.{DAILY_TABLE}",))
+            existe = bool(cur.fetchone()[0])
+        return existe, (_versao_db(conn, CLEAN_TABLE) if existe else (0, 0))
+
+
+def carregar_cubo_mes(ano: int, mes: int, praca: str | None = None, sub_pracas=None) -> pd.DataFrame:
+    """
+    Cubo diário de um mês: uma linha por (data, periodo, praca, sub_praca,
+    entregador) com linhas + somas de corridas e segundos_abs. Mesmos nomes
+    de coluna da base, então dá pra passar direto pras funções de relatório
+    que só somam (ex.: relatorios.utr_por_entregador_turno).
+    Sem a tabela do cubo no banco, agrega o mês em memória.
+    """
+    ano, mes = int(ano), int(mes)
+    existe, versao = _versao_cubo()
+    if existe:
+        d = _mes_em_cache((DAILY_TABLE, ano, mes, praca, ()), versao, lambda: _ler_cubo_mes(ano, mes, praca))
+    else:
+        # dimensões e somas do cubo estão todas na base
+        linhas = carregar_mes(ano, mes, praca=praca, grupos=())
+        d = _pos_processar_cubo(_rollup(linhas))
+
+    if sub_pracas:
+        d = apply_sub_filter(d, list(sub_pracas), praca_scope="SAO PAULO")
+    return d
+
+
+# ---- agregação no banco (gráficos mensais) ----
+# Mesma regra do shared._clean_sub_praca / apply_sub_filter, em SQL.
+_SQL_SUB_VAZIA = "coalesce(lower(btrim(sub_praca)), '') in ('', 'none', 'null', 'nan', 'na')"
+
+
+def _where_filtros(sub_pracas, turno, entregadores) -> tuple[str, list]:
+    """Filtros da tela (subpraça com LIVRE, turno, entregadores) -> (sql, params)."""
+    conds, params = [], []
+
+    subs = [x for x in (sub_pracas or []) if x != "LIVRE"]
+    ou = []
+    if subs:
+        ou.append("btrim(sub_praca) = any(%s)")
+        params.append(list(subs))
+    if "LIVRE" in (sub_pracas or []):
+        ou.append(f"(praca = 'SAO PAULO' and {_SQL_SUB_VAZIA})")
+    if ou:
+        conds.append("(" + " or ".join(ou) + ")")
+
+    if turno:
+        conds.append("periodo = %s")
+        params.append(turno)
+    if entregadores:
+        conds.append("pessoa_entregadora = any(%s)")
+        params.append(list(entregadores))
+
+    return (" and ".join(conds) or "true"), params
+
+
+def _ler_totais_mensais(fonte: str, sub_pracas, turno, entregadores) -> pd.DataFrame:
+    where, params = _where_filtros(sub_pracas, turno, entregadores)
+    if fonte == DAILY_TABLE:
+        col_data, seg = "data", "segundos_abs"
+    else:
+        col_data, seg = "data_do_periodo", "greatest(segundos_abs_raw, 0)"
+        where += " and import_id in (select id from public.imports)"
+
+    sql = f"""
+        select
+          date_trunc('month', {col_data})::date as mes_ano,
+          sum(numero_de_corridas_ofertadas) as numero_de_corridas_ofertadas,
+          sum(numero_de_corridas_aceitas) as numero_de_corridas_aceitas,
+          sum(numero_de_corridas_rejeitadas) as numero_de_corridas_rejeitadas,
+          sum(numero_de_corridas_completadas) as numero_de_corridas_completadas,
+          sum({seg}) as segundos_abs
+        from public.{fonte}
+        where {col_data} is not null and {where}
+        group by 1
+        order by 1
+    """
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+
+    df = pd.DataFrame(rows, columns=["mes_ano"] + _SOMAS_CUBO)
+    df["mes_ano"] = pd.to_datetime(df["mes_ano"])
+    for c in _SOMAS_CUBO:
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype("int64")
+    return df
+
+
+def totais_mensais(sub_pracas=(), turno: str | None = None, entregadores=()) -> pd.DataFrame | None:
+    """
+    Somas por mês (ofertadas/aceitas/rejeitadas/completadas/segundos_abs)
+    calculadas no Postgres com os filtros da tela. Volta poucas linhas
+    (uma por mês), com cache por filtro + versão da base.
+    Fonte: cubo diário se existir, senão a tabela tipada. Só com a RAW
+    (texto) devolve None e a tela agrega em memória como antes.
+    """
+    existe_cubo, versao = _versao_cubo()
+    if existe_cubo:
+        fonte = DAILY_TABLE
+    else:
+        with _connect() as conn:
+            fonte = _tabela_fonte(conn)
+            if fonte != CLEAN_TABLE:
+                return None
+            versao = _versao_db(conn, fonte)
+
+    spec = (tuple(sorted(sub_pracas or ())), turno or None, tuple(sorted(entregadores or ())))
+    return _mes_em_cache(
+        (fonte, "totais_mensais") + spec, versao,
+        lambda: _ler_totais_mensais(fonte, *spec),
+    )
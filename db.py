@@ -1,9 +1,16 @@
 import os
 import json
+import atexit
+import logging
+import queue
+import threading
+import time
 from contextlib import contextmanager
+from datetime import datetime, timezone
 
-import psycopg
 import streamlit as st
+from psycopg import OperationalError
+from psycopg_pool import ConnectionPool, PoolTimeout
 
 
 def get_dsn() -> str:
@@ -22,16 +29,53 @@ def get_dsn() -> str:
     return dsn
 
 
+# pool único do processo: TLS + auth no Supabase uma vez por conexão, não
+# por clique. Conexão é testada (select 1) antes de ser entregue.
+_POOL_MIN = int(os.environ.get("PAINEL_DB_POOL_MIN", "1"))
+_POOL_MAX = int(os.environ.get("PAINEL_DB_POOL_MAX", "10"))
+_POOL_TIMEOUT = float(os.environ.get("PAINEL_DB_POOL_TIMEOUT", "10"))
+
+
+@st.cache_resource(show_spinner=False)
+def _pool() -> ConnectionPool:
+    return ConnectionPool(
+        get_dsn(),
+        min_size=_POOL_MIN,
+        max_size=max(_POOL_MIN, _POOL_MAX),
+        timeout=_POOL_TIMEOUT,
+        max_idle=300,
+        max_lifetime=1800,
+        check=ConnectionPool.check_connection,
+        # pooler do Supabase (transaction mode) não guarda prepared statement
+        # entre transações; conexão longa chegaria no prepare automático
+        kwargs={"connect_timeout": 10, "prepare_threshold": None},
+        name="painel",
+        open=True,
+    )
+
+
 @contextmanager
 def db_conn():
-    conn = psycopg.connect(get_dsn(), connect_timeout=10)
-    try:
+    """
+    Conexão emprestada do pool (espera até _POOL_TIMEOUT se estiver cheio).
+    Na saída volta pro pool: transação aberta é commitada, ou desfeita se
+    o bloco levantou exceção.
+    """
+    with _pool().connection() as conn:
         yield conn
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+
+
+def get_conn():
+    """Empresta uma conexão do pool pra quem controla a transação na mão; devolver com put_conn."""
+    return _pool().getconn()
+
+
+def put_conn(conn) -> None:
+    """Devolve ao pool (transação pendente é desfeita pelo pool)."""
+    try:
+        _pool().putconn(conn)
+    except Exception:
+        pass
 
 
 def fetch_all(conn, sql: str, params=None):
@@ -56,6 +100,81 @@ def ensure_table_exists(conn, table: str) -> bool:
     return len(rows) > 0
 
 
+# ---- catálogo de schema (colunas por tabela, cache do processo) ----
+# login e import consultam as colunas de app_users/imports/RAW toda vez;
+# o schema quase nunca muda, então fica em memória por _SCHEMA_TTL segundos
+# e é invalidado na hora por quem altera tabela (ensure_import_columns).
+_SCHEMA_TTL = int(os.environ.get("PAINEL_SCHEMA_TTL_SEG", "600"))
+
+
+@st.cache_resource(show_spinner=False)
+def _schema_cache() -> dict:
+    return {"tabelas": {}, "lock": threading.Lock()}
+
+
+def table_columns(conn, table: str) -> list[str]:
+    """
+    Colunas de public.<table> na ordem do banco ([] se a tabela não existe).
+    conn pode ser conexão ou cursor (usa a transação de quem chamou).
+    """
+    cache = _schema_cache()
+    agora = time.monotonic()
+    with cache["lock"]:
+        item = cache["tabelas"].get(table)
+    if item is not None and agora - item[0] < _SCHEMA_TTL:
+        return item[1]
+
+    rows = conn.execute(
+        """
+        select column_name
+        from information_schema.columns
+        where table_schema='public' and table_name=%s
+        order by ordinal_position
+        """,
+        (table,),
+    ).fetchall()
+    cols = [r[0] for r in rows]
+
+    # tabela ausente não entra: quando for criada aparece na próxima consulta
+    if cols:
+        with cache["lock"]:
+            cache["tabelas"][table] = (agora, cols)
+    return cols
+
+
+def invalidate_schema_cache(table: str | None = None) -> None:
+    cache = _schema_cache()
+    with cache["lock"]:
+        if table is None:
+            cache["tabelas"].clear()
+        else:
+            cache["tabelas"].pop(table, None)
+
+
+# ---- paginação (keyset) das telas de admin ----
+def audit_order_cols(conn) -> list[str]:
+    """Ordem estável do audit_log pra paginar por cursor: ts (+ id, se a tabela tiver)."""
+    return ["ts", "id"] if "id" in table_columns(conn, "audit_log") else ["ts"]
+
+
+@st.cache_data(show_spinner=False, ttl=60)
+def approx_count(table: str) -> int:
+    """
+    Total de linhas pro rodapé da paginação sem count(*) a cada página:
+    estimativa do planner (pg_class.reltuples) em tabela grande; conta
+    exata só em tabela pequena ou nunca analisada. Cache de 60s.
+    """
+    with db_conn() as conn:
+        row = conn.execute(
+            "select reltuples::bigint from pg_class where oid = to_regclass(%s)",
+            (f"public.{table}",),
+        ).fetchone()
+        estimativa = int(row[0]) if row and row[0] is not None else -1
+        if estimativa >= 10000:
+            return estimativa
+        return int(conn.execute(f"select count(*) from public.{table}").fetchone()[0])
+
+
 def ensure_import_columns(conn):
     # garante colunas de "quem importou"
     with conn.cursor() as cur:
@@ -67,10 +186,579 @@ def ensure_import_columns(conn):
             """
         )
     conn.commit()
+    invalidate_schema_cache("imports")
+
+
+RAW_TABLE = "base_2025_raw"
+CLEAN_TABLE = "base_2025_clean"
+DAILY_TABLE = "base_2025_diario"
+
+# funções de parse (PT-BR) usadas pra popular a tabela tipada; mesmas regras
+# do utils (numero_ptbr_serie / tempo_para_segundos / to_datetime).
+# Sem bloco exception (cada um abre uma subtransação por chamada, ~10 por
+# linha no backfill): o regex valida antes e só chega no cast o que ele
+# aceita; ordem de grandeza fora do double vira inf/0 antes do cast.
+# As painel_* são SQL de uma expressão (o planner embute na query): o
+# formato comum ('12', '12,5', '1.234,50', 'HH:MM:SS', 'AAAA-MM-DD') sai
+# com um `~` e um cast; o resto cai nas *_geral (plpgsql, regra completa).
+# Diferença conhecida: '_' e dígito não-ASCII (o int()/float() do Python
+# aceitam) viram 0 aqui.
+_SQL_FUNCOES_PARSE = r"""
+create or replace function public.painel_num(sinal text, inteiro text, frac text, expoente text)
+returns double precision
+language plpgsql immutable as $$
+declare
+  i text := ltrim(coalesce(inteiro, ''), '0');
+  f text := coalesce(frac, '');
+  e text := ltrim(coalesce(expoente, ''), '+');
+  ed text := ltrim(ltrim(e, '-'), '0');
+  x integer;
+  mag integer;
+  r double precision;
+begin
+  -- expoente com mais de 6 dígitos estoura (ou zera) de qualquer jeito
+  x := case when length(ed) > 6 then 1000000 else coalesce(nullif(ed, ''), '0')::integer end;
+  if left(e, 1) = '-' then x := -x; end if;
+
+  -- ordem de grandeza do primeiro dígito significativo
+  if i <> '' then
+    mag := length(i) - 1 + x;
+  elsif ltrim(f, '0') <> '' then
+    mag := x - (length(f) - length(ltrim(f, '0'))) - 1;
+  else
+    return 0;
+  end if;
+
+  if mag < -323 then
+    return 0;
+  elsif mag > 308 or (
+    mag = 308
+    and (coalesce(nullif(i, ''), '0') || '.' || f || 'e' || x)::numeric >= 1.7976931348623158e308
+  ) then
+    r := 'Infinity';
+  else
+    r := (coalesce(nullif(i, ''), '0') || '.' || coalesce(nullif(f, ''), '0') || 'e' || x)::double precision;
+  end if;
+  if sinal = '-' then return -r; end if;
+  return r;
+end $$;
+
+create or replace function public.painel_ptbr_float_geral(v text) returns double precision
+language plpgsql immutable as $$
+declare
+  s text := btrim(coalesce(v, ''), E' \t\r\n');
+  m text[];
+begin
+  if s = '' then return 0; end if;
+  -- sinal, inteiro (com ou sem milhar '.') e decimal opcional ','
+  m := regexp_match(s, '^([+-]?)(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d+))?$');
+  if m is not null then
+    return public.painel_num(m[1], replace(m[2], '.', ''), m[3], null);
+  end if;
+  -- não casou: número comum ('12.5', '3', '1e3'), igual ao float() do Python
+  m := regexp_match(s, '^([+-]?)(\d*)(?:\.(\d*))?(?:[eE]([+-]?\d+))?$');
+  if m is not null and (m[2] <> '' or coalesce(m[3], '') <> '') then
+    return public.painel_num(m[1], m[2], m[3], m[4]);
+  end if;
+  if lower(s) in ('inf', '+inf', 'infinity', '+infinity') then return 'Infinity'; end if;
+  if lower(s) in ('-inf', '-infinity') then return '-Infinity'; end if;
+  return 0;  -- lixo / nan
+end $$;
+
+create or replace function public.painel_ptbr_float(v text) returns double precision
+language sql immutable as $$
+  select case
+    when btrim(v) ~ '^[+-]?\d{1,15}$' then btrim(v)::double precision
+    when btrim(v) ~ '^[+-]?\d{1,15},\d+$' then replace(btrim(v), ',', '.')::double precision
+    when btrim(v) ~ '^[+-]?\d{1,3}(\.\d{3}){1,4}(,\d+)?$'
+      then replace(replace(btrim(v), '.', ''), ',', '.')::double precision
+    else public.painel_ptbr_float_geral(v)
+  end
+$$;
+
+create or replace function public.painel_ptbr_int_geral(v text) returns integer
+language plpgsql immutable as $$
+declare
+  r double precision := public.painel_ptbr_float_geral(v);
+begin
+  -- mesmo número do float, truncado em direção a zero (astype int64);
+  -- fora do integer (ou inf) vira 0
+  if abs(r) < 2147483648 then return trunc(r)::integer; end if;
+  return 0;
+end $$;
+
+create or replace function public.painel_ptbr_int(v text) returns integer
+language sql immutable as $$
+  select case
+    when btrim(v) ~ '^[+-]?\d{1,9}$' then btrim(v)::integer
+    else public.painel_ptbr_int_geral(v)
+  end
+$$;
+
+create or replace function public.painel_segundos_geral(v text) returns integer
+language plpgsql immutable as $$
+declare
+  s text := btrim(coalesce(v, ''), E' \t\r\n');
+  sinal integer := 1;
+  p text[];
+  t numeric;
+  r double precision;
+begin
+  if left(s, 1) = '-' then sinal := -1; end if;
+  s := ltrim(s, '+-');
+  -- HH:MM[:SS]; o int() do Python aceita espaço e sinal em cada parte
+  p := regexp_match(s, '^\s*([+-]?\d+)\s*:\s*([+-]?\d+)\s*(?::\s*([+-]?\d+)\s*)?$');
+  if p is not null then
+    t := p[1]::numeric * 3600 + p[2]::numeric * 60 + coalesce(p[3], '0')::numeric;
+  else
+    -- número puro = segundos, truncado (int(float(s)))
+    p := regexp_match(s, '^\s*([+-]?)(\d*)(?:\.(\d*))?(?:[eE]([+-]?\d+))?\s*$');
+    if p is null or (p[2] = '' and coalesce(p[3], '') = '') then return 0; end if;
+    r := public.painel_num(p[1], p[2], p[3], p[4]);
+    if abs(r) >= 2147483648 then return 0; end if;
+    t := trunc(r);
+  end if;
+  if abs(t) >= 2147483648 then return 0; end if;
+  return sinal * t::integer;
+end $$;
+
+create or replace function public.painel_segundos(v text) returns integer
+language sql immutable as $$
+  select case
+    when btrim(v) ~ '^-?\d{1,5}:\d{1,2}:\d{1,2}$' then
+      (case when left(btrim(v), 1) = '-' then -1 else 1 end) * (
+        split_part(ltrim(btrim(v), '-'), ':', 1)::integer * 3600
+        + split_part(btrim(v), ':', 2)::integer * 60
+        + split_part(btrim(v), ':', 3)::integer
+      )
+    else public.painel_segundos_geral(v)
+  end
+$$;
+
+create or replace function public.painel_data_geral(v text) returns date
+language plpgsql immutable as $$
+declare
+  p text[] := regexp_match(btrim(coalesce(v, '')), '^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T].*)?$');
+  a integer;
+  m integer;
+  d integer;
+begin
+  -- a RAW guarda ISO (AAAA-MM-DD[ hora]); o resto vira nulo, como o coerce
+  if p is null then return null; end if;
+  a := p[1]::integer;
+  m := p[2]::integer;
+  d := p[3]::integer;
+  if a < 1 or m not between 1 and 12 or d < 1 then return null; end if;
+  if d > extract(day from make_date(a, m, 1) + interval '1 month' - interval '1 day') then
+    return null;
+  end if;
+  return make_date(a, m, d);
+end $$;
+
+create or replace function public.painel_data(v text) returns date
+language sql immutable as $$
+  select case
+    -- dia que existe em qualquer ano (29/02 e o resto vão pro _geral)
+    when btrim(v) ~ '^\d{4}-((0[1-9]|1[0-2])-(0[1-9]|1\d|2[0-8])|(0[13-9]|1[0-2])-(29|30)|(0[13578]|1[02])-31)$'
+      and left(btrim(v), 4) <> '0000'
+      then make_date(left(btrim(v), 4)::integer, substr(btrim(v), 6, 2)::integer, right(btrim(v), 2)::integer)
+    else public.painel_data_geral(v)
+  end
+$$;
+"""
+
+_SQL_CLEAN_TABLE = f"""
+create table if not exists public.{CLEAN_TABLE} (
+  import_id bigint not null,
+  row_number bigint not null,
+  data_do_periodo date,
+  periodo text,
+  duracao_do_periodo text,
+  duracao_do_periodo_segundos integer not null default 0,
+  numero_minimo_de_entregadores_regulares_na_escala double precision not null default 0,
+  tag text,
+  id_da_pessoa_entregadora text,
+  pessoa_entregadora text,
+  praca text,
+  sub_praca text,
+  origem text,
+  tempo_disponivel_escalado double precision not null default 0,
+  tempo_disponivel_absoluto text,
+  segundos_abs_raw integer not null default 0,
+  numero_de_corridas_ofertadas integer not null default 0,
+  numero_de_corridas_aceitas integer not null default 0,
+  numero_de_corridas_rejeitadas integer not null default 0,
+  numero_de_corridas_completadas integer not null default 0,
+  numero_de_corridas_canceladas_pela_pessoa_entregadora integer not null default 0,
+  numero_de_pedidos_aceitos_e_concluidos integer not null default 0,
+  soma_das_taxas_das_corridas_aceitas double precision not null default 0,
+  loaded_at timestamptz not null default now(),
+  primary key (import_id, row_number)
+);
+"""
+
+_SQL_CLEAN_INSERT = f"""
+insert into public.{CLEAN_TABLE} (
+  import_id, row_number, data_do_periodo, periodo, duracao_do_periodo, duracao_do_periodo_segundos,
+  numero_minimo_de_entregadores_regulares_na_escala, tag, id_da_pessoa_entregadora,
+  pessoa_entregadora, praca, sub_praca, origem, tempo_disponivel_escalado,
+  tempo_disponivel_absoluto, segundos_abs_raw,
+  numero_de_corridas_ofertadas, numero_de_corridas_aceitas, numero_de_corridas_rejeitadas,
+  numero_de_corridas_completadas, numero_de_corridas_canceladas_pela_pessoa_entregadora,
+  numero_de_pedidos_aceitos_e_concluidos, soma_das_taxas_das_corridas_aceitas
+)
+select
+  r.import_id, r.row_number,
+  public.painel_data(r.data_do_periodo::text),
+  r.periodo, r.duracao_do_periodo,
+  public.painel_segundos(r.duracao_do_periodo::text),
+  public.painel_ptbr_float(r.numero_minimo_de_entregadores_regulares_na_escala::text),
+  r.tag, r.id_da_pessoa_entregadora::text, r.pessoa_entregadora, r.praca, r.sub_praca, r.origem,
+  public.painel_ptbr_float(r.tempo_disponivel_escalado::text),
+  r.tempo_disponivel_absoluto,
+  public.painel_segundos(r.tempo_disponivel_absoluto::text),
+  public.painel_ptbr_int(r.numero_de_corridas_ofertadas::text),
+  public.painel_ptbr_int(r.numero_de_corridas_aceitas::text),
+  public.painel_ptbr_int(r.numero_de_corridas_rejeitadas::text),
+  public.painel_ptbr_int(r.numero_de_corridas_completadas::text),
+  public.painel_ptbr_int(r.numero_de_corridas_canceladas_pela_pessoa_entregadora::text),
+  public.painel_ptbr_int(r.numero_de_pedidos_aceitos_e_concluidos::text),
+  public.painel_ptbr_float(r.soma_das_taxas_das_corridas_aceitas::text)
+from public.{RAW_TABLE} r
+where {{where}}
+on conflict (import_id, row_number) do nothing
+"""
+
+
+def sync_clean_import(cur, import_id: int) -> int:
+    """Copia (tipando) as linhas RAW de um import pra tabela tipada. Não commita."""
+    cur.execute(_SQL_CLEAN_INSERT.format(where="r.import_id = %s"), (int(import_id),))
+    return cur.rowcount
+
+
+def ensure_clean_table(conn) -> int:
+    """
+    Garante a tabela tipada (+ funções de parse), poda imports apagados e
+    faz backfill dos imports RAW que ainda não estão nela. Idempotente.
+    Retorna linhas copiadas.
+    """
+    with conn.cursor() as cur:
+        cur.execute(_SQL_FUNCOES_PARSE)
+        cur.execute(_SQL_CLEAN_TABLE)
+        # mesma trava do upload (sync_import): import que chega durante o
+        # backfill espera e depois se sincroniza sozinho
+        _travar_cubo(cur)
+        # antes do backfill: o max(import_id) abaixo não pode ser de import apagado
+        podar_imports_apagados(cur)
+        cur.execute(
+            _SQL_CLEAN_INSERT.format(
+                where=(
+                    f"r.import_id > (select coalesce(max(import_id), 0) from public.{CLEAN_TABLE})"
+                    " and r.import_id in (select id from public.imports)"
+                )
+            )
+        )
+        copied = cur.rowcount
+    conn.commit()
+    return copied
+
+
+# cubo diário: soma por (data, turno, praça, subpraça, entregador).
+# Mantido junto com a tabela tipada; import novo só refaz os dias que tocou.
+# ate_import_id = maior import que entrou na linha (pra saber o que falta).
+_SQL_DAILY_TABLE = f"""
+create table if not exists public.{DAILY_TABLE} (
+  data date not null,
+  periodo text,
+  praca text,
+  sub_praca text,
+  pessoa_entregadora text,
+  id_da_pessoa_entregadora text,
+  linhas integer not null default 0,
+  numero_de_corridas_ofertadas bigint not null default 0,
+  numero_de_corridas_aceitas bigint not null default 0,
+  numero_de_corridas_rejeitadas bigint not null default 0,
+  numero_de_corridas_completadas bigint not null default 0,
+  segundos_abs bigint not null default 0,
+  ate_import_id bigint not null default 0
+);
+create index if not exists {DAILY_TABLE}_data_idx on public.{DAILY_TABLE} (data);
+"""
+
+_SQL_DAILY_DIAS = f"""
+select distinct c.data_do_periodo from public.{CLEAN_TABLE} c
+where c.data_do_periodo is not null and {{where}}
+"""
+
+_SQL_DAILY_DELETE = f"""
+delete from public.{DAILY_TABLE}
+where data = any(%s)
+"""
+
+_SQL_DAILY_INSERT = f"""
+insert into public.{DAILY_TABLE} (
+  data, periodo, praca, sub_praca, pessoa_entregadora, id_da_pessoa_entregadora,
+  linhas, numero_de_corridas_ofertadas, numero_de_corridas_aceitas,
+  numero_de_corridas_rejeitadas, numero_de_corridas_completadas, segundos_abs, ate_import_id
+)
+select
+  c.data_do_periodo, c.periodo, c.praca, c.sub_praca, c.pessoa_entregadora, c.id_da_pessoa_entregadora,
+  count(*),
+  sum(c.numero_de_corridas_ofertadas),
+  sum(c.numero_de_corridas_aceitas),
+  sum(c.numero_de_corridas_rejeitadas),
+  sum(c.numero_de_corridas_completadas),
+  sum(greatest(c.segundos_abs_raw, 0)),
+  max(c.import_id)
+from public.{CLEAN_TABLE} c
+where c.data_do_periodo = any(%s)
+group by 1, 2, 3, 4, 5, 6
+"""
+
+# import_id distintos da tipada pelo índice da PK (skip scan: 1 busca por
+# import, não varre a tabela) que não existem mais em imports (apagados à mão)
+_SQL_IMPORTS_APAGADOS = f"""
+with recursive ids as (
+  (select import_id from public.{CLEAN_TABLE} order by import_id limit 1)
+  union all
+  select (
+    select c.import_id from public.{CLEAN_TABLE} c
+    where c.import_id > ids.import_id
+    order by c.import_id
+    limit 1
+  )
+  from ids
+  where ids.import_id is not null
+)
+select import_id from ids where import_id is not null
+except
+select id from public.imports
+"""
+
+
+def _existe(cur, tabela: str) -> bool:
+    cur.execute("select to_regclass(%s) is not null", (f"public.{tabela}",))
+    return bool(cur.fetchone()[0])
+
+
+def _travar_cubo(cur) -> None:
+    """
+    Um sync (tipada/cubo) por vez no banco todo, até o commit. Sem isso, dois
+    uploads no mesmo dia apagam (cada um no seu snapshot) e inserem os dois:
+    linha duplicada. Chave única + ON CONFLICT não serve aqui: periodo/praca/
+    sub_praca/entregador podem ser NULL e NULL não colide na unique.
+    Trava por import também não: imports diferentes tocam o mesmo dia.
+    """
+    cur.execute("select pg_advisory_xact_lock(hashtext(%s))", (f"public.{DAILY_TABLE}",))
+
+
+def _refazer_dias(cur, dias: list) -> int:
+    """Reagrega no cubo os `dias` a partir da tipada (dia sem linha some)."""
+    if not dias:
+        return 0
+    cur.execute(_SQL_DAILY_DELETE, (dias,))
+    cur.execute(_SQL_DAILY_INSERT, (dias,))
+    return cur.rowcount
+
+
+def _dias_tipados(cur, where: str, params=()) -> list:
+    cur.execute(_SQL_DAILY_DIAS.format(where=where), params)
+    return [r[0] for r in cur.fetchall()]
+
+
+def _sync_daily(cur, where: str, params=()) -> int:
+    """Refaz no cubo os dias que aparecem nas linhas tipadas filtradas por `where`."""
+    return _refazer_dias(cur, _dias_tipados(cur, where, params))
+
+
+def podar_imports_apagados(cur) -> int:
+    """
+    Tira da tabela tipada os imports que não estão mais em imports e refaz
+    no cubo os dias deles. Sem isso a recarga completa do loader (que lê da
+    tipada) traz de volta o que foi apagado. Não commita. Retorna linhas
+    apagadas da tipada.
+    """
+    if not _existe(cur, CLEAN_TABLE):
+        return 0
+    _travar_cubo(cur)
+    cur.execute(_SQL_IMPORTS_APAGADOS)
+    apagados = [int(r[0]) for r in cur.fetchall()]
+    if not apagados:
+        return 0
+
+    dias = _dias_tipados(cur, "c.import_id = any(%s)", (apagados,))
+    cur.execute(f"delete from public.{CLEAN_TABLE} where import_id = any(%s)", (apagados,))
+    linhas = cur.rowcount
+    if _existe(cur, DAILY_TABLE):
+        _refazer_dias(cur, dias)
+    return linhas
+
+
+def sync_daily_import(cur, import_id: int) -> int:
+    """Atualiza o cubo diário só nos dias tocados pelo import. Não commita (a trava vai até o commit)."""
+    _travar_cubo(cur)
+    return _sync_daily(cur, "c.import_id = %s", (int(import_id),))
+
+
+def sync_import(cur, import_id: int) -> bool:
+    """
+    Caminho do upload (só DML, na transação do chamador; não commita): poda
+    imports apagados e leva o import pra tipada e pro cubo. Tabela que ainda
+    não existe (bootstrap não rodou/está rodando) fica de fora: o backfill do
+    ensure_clean_table/ensure_daily_table pega o import depois. Retorna False
+    nesse caso.
+    """
+    # antes do to_regclass: se o bootstrap está criando a tabela, espera o commit dele
+    _travar_cubo(cur)
+    if not _existe(cur, CLEAN_TABLE):
+        return False
+    podar_imports_apagados(cur)
+    sync_clean_import(cur, import_id)
+    if not _existe(cur, DAILY_TABLE):
+        return False
+    sync_daily_import(cur, import_id)
+    return True
+
+
+def ensure_daily_table(conn) -> int:
+    """
+    Garante o cubo diário e refaz os dias de imports tipados que ainda não
+    entraram nele (primeira vez = tudo). Idempotente. Retorna linhas gravadas.
+    Depende da tabela tipada (ensure_clean_table antes).
+    """
+    with conn.cursor() as cur:
+        cur.execute(_SQL_DAILY_TABLE)
+        # trava antes de ler até onde o cubo foi: outro sync em andamento termina primeiro
+        _travar_cubo(cur)
+        cur.execute(f"select coalesce(max(ate_import_id), 0) from public.{DAILY_TABLE}")
+        ate = int(cur.fetchone()[0] or 0)
+        gravadas = _sync_daily(cur, "c.import_id > %s", (ate,))
+    conn.commit()
+    return gravadas
+
+
+# ---- audit_log assíncrono ----
+# audit_log() só enfileira (sem I/O no rerun). Uma thread do processo grava em
+# lote (um insert multi-linha) a cada _AUDIT_LOTE eventos ou _AUDIT_INTERVALO
+# segundos, o que vier primeiro; no encerramento do processo descarrega o resto.
+_AUDIT_LOTE = int(os.environ.get("PAINEL_AUDIT_LOTE", "50"))
+_AUDIT_INTERVALO = int(os.environ.get("PAINEL_AUDIT_INTERVALO_MS", "500")) / 1000
+_AUDIT_MAX_PENDENTES = 5000  # banco fora do ar: guarda até isso e descarta os mais velhos
+
+_SQL_AUDIT = """
+insert into public.audit_log (ts, actor_user_id, actor_login, action, entity, entity_id, metadata)
+values {linhas}
+"""
+_SQL_AUDIT_LINHA = "(%s, %s, %s, %s, %s, %s, %s::jsonb)"
+
+
+def _gravar_audit(eventos: list[tuple]) -> None:
+    sql = _SQL_AUDIT.format(linhas=", ".join([_SQL_AUDIT_LINHA] * len(eventos)))
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, [v for e in eventos for v in e])
+        conn.commit()
+
+
+# banco/rede/pool fora: o evento não tem culpa, tenta de novo depois
+_ERROS_AUDIT_TRANSITORIOS = (OperationalError, PoolTimeout)
+_log = logging.getLogger(__name__)
+
+
+def _gravar_audit_linha_a_linha(w: dict, lote: list[tuple]) -> list[tuple]:
+    """
+    Lote recusado por erro de dado (constraint, JSON inválido...): grava um a
+    um, descarta (com log) só os que falham. Devolve o que sobrou se o banco
+    cair no meio.
+    """
+    for i, ev in enumerate(lote):
+        try:
+            _gravar_audit([ev])
+        except _ERROS_AUDIT_TRANSITORIOS:
+            return lote[i:]
+        except Exception as e:
+            w["descartados"] += 1
+            w["erro"] = repr(e)
+            _log.warning("audit_log: evento descartado (%s, %s): %r", ev[3], ev[5], e)
+    return []
+
+
+def _descarregar_audit(w: dict, pendentes: list[tuple]) -> list[tuple]:
+    """
+    Grava em lotes; devolve o que não deu pra gravar por erro transitório
+    (tenta de novo no próximo ciclo). Erro de dado nunca trava a fila.
+    """
+    while pendentes:
+        lote = pendentes[:_AUDIT_LOTE]
+        try:
+            _gravar_audit(lote)
+        except _ERROS_AUDIT_TRANSITORIOS as e:
+            w["erro"] = repr(e)
+            return pendentes[-_AUDIT_MAX_PENDENTES:]
+        except Exception:
+            sobra = _gravar_audit_linha_a_linha(w, lote)
+            if sobra:
+                return (sobra + pendentes[len(lote):])[-_AUDIT_MAX_PENDENTES:]
+        else:
+            w["erro"] = None
+        pendentes = pendentes[len(lote):]
+    return pendentes
+
+
+def _rodar_audit(w: dict) -> None:
+    fila = w["fila"]
+    pendentes: list[tuple] = []
+    avisar: list[threading.Event] = []
+    while not (w["parar"].is_set() and fila.empty()):
+        try:
+            item = fila.get(timeout=_AUDIT_INTERVALO)
+            prazo = time.monotonic() + _AUDIT_INTERVALO
+            while True:
+                if isinstance(item, threading.Event):
+                    avisar.append(item)  # audit_flush(): grava já
+                    break
+                pendentes.append(item)
+                resta = prazo - time.monotonic()
+                if len(pendentes) >= _AUDIT_LOTE or resta <= 0 or w["parar"].is_set():
+                    break
+                item = fila.get(timeout=resta)
+        except queue.Empty:
+            pass
+        if pendentes:
+            pendentes = _descarregar_audit(w, pendentes)
+        for ev in avisar:
+            ev.set()
+        avisar.clear()
+    if pendentes:
+        _descarregar_audit(w, pendentes)
+
+
+def _encerrar_audit(w: dict) -> None:
+    w["parar"].set()
+    w["thread"].join(timeout=10)
+
+
+@st.cache_resource(show_spinner=False)
+def _audit_writer() -> dict:
+    w = {"fila": queue.Queue(), "parar": threading.Event(), "thread": None, "erro": None, "descartados": 0}
+    w["thread"] = threading.Thread(target=_rodar_audit, args=(w,), name="painel-audit", daemon=True)
+    w["thread"].start()
+    atexit.register(_encerrar_audit, w)
+    return w
+
+
+def audit_flush(timeout: float = 5.0) -> bool:
+    """Espera a fila do audit_log ir pro banco (ex.: antes de listar a auditoria)."""
+    ev = threading.Event()
+    _audit_writer()["fila"].put(ev)
+    return ev.wait(timeout)
 
 
 def audit_log(action: str, entity: str | None = None, entity_id: str | None = None, metadata: dict | None = None):
-    """Loga evento no audit_log usando o usuário logado no session_state."""
+    """
+    Loga evento no audit_log usando o usuário logado no session_state.
+    Só enfileira: a gravação é em lote, em background (ts = hora do evento).
+    """
     actor_user_id = st.session_state.get("user_id")
     actor_login = st.session_state.get("usuario")
 
@@ -80,13 +768,6 @@ def audit_log(action: str, entity: str | None = None, entity_id: str | None = No
     except Exception:
         meta_json = "{}"
 
-    with db_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                insert into public.audit_log (actor_user_id, actor_login, action, entity, entity_id, metadata)
-                values (%s, %s, %s, %s, %s, %s::jsonb)
-                """,
-                (actor_user_id, actor_login, action, entity, entity_id, meta_json),
-            )
-        conn.commit()
+    _audit_writer()["fila"].put(
+        (datetime.now(timezone.utc), actor_user_id, actor_login, action, entity, entity_id, meta_json)
+    )
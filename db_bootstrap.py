@@ -0,0 +1,206 @@
+# db_bootstrap.py
+"""
+Schema que os caminhos de leitura do painel precisam (idempotente, no
+espírito do db.ensure_import_columns):
+
+  - tabela tipada + cubo diário (db.ensure_clean_table/ensure_daily_table:
+    funções de parse, DDL e backfill dos imports que faltam). O upload só
+    faz o sync do import dele (db.sync_import), sem DDL;
+
+  - base_2025_raw / base_2025_clean: carga incremental (import_id > x),
+    recorte por período (data_do_periodo) e busca por entregador;
+  - imports: checagem de duplicado no upload (sha256 / file_name / source_name);
+  - audit_log / app_users: paginação por cursor (keyset) da Auditoria e da
+    lista de usuários (mesma ordem do ORDER BY das telas);
+  - audit_log: últimas ações do usuário no perfil (actor_user_id) e os
+    filtros da Auditoria (btree por quem/ação/entidade com ts na frente da
+    ordenação; GIN no metadata pra busca por chave `?` e chave=valor `@>`).
+
+Rodar no deploy (a criação na RAW grande pode levar minutos):
+    python db_bootstrap.py
+O app também dispara 1x por processo numa thread (main.py), fora do
+caminho de qualquer clique; o Upload só mostra o relatório quando sai.
+As tabelas vêm antes dos índices (os da tipada dependem dela).
+"""
+import logging
+import threading
+
+import streamlit as st
+
+from db import (
+    RAW_TABLE,
+    CLEAN_TABLE,
+    db_conn,
+    ensure_clean_table,
+    ensure_daily_table,
+    table_columns,
+)
+
+_log = logging.getLogger(__name__)
+
+# (nome do índice, tabela, colunas que precisam existir, definição)
+# "!col" = a coluna NÃO pode existir (variante pra schema sem ela)
+INDICES = [
+    (
+        f"{RAW_TABLE}_chave_uq", RAW_TABLE, ("import_id", "row_number"),
+        "create unique index concurrently if not exists {nome} on public.{tabela} (import_id, row_number)",
+    ),
+    (
+        f"{RAW_TABLE}_data_idx", RAW_TABLE, ("data_do_periodo",),
+        "create index concurrently if not exists {nome} on public.{tabela} (data_do_periodo)",
+    ),
+    (
+        f"{RAW_TABLE}_entregador_idx", RAW_TABLE, ("id_da_pessoa_entregadora",),
+        "create index concurrently if not exists {nome} on public.{tabela} (id_da_pessoa_entregadora)",
+    ),
+    (
+        f"{CLEAN_TABLE}_data_idx", CLEAN_TABLE, ("data_do_periodo",),
+        "create index concurrently if not exists {nome} on public.{tabela} (data_do_periodo)",
+    ),
+    (
+        f"{CLEAN_TABLE}_entregador_idx", CLEAN_TABLE, ("id_da_pessoa_entregadora",),
+        "create index concurrently if not exists {nome} on public.{tabela} (id_da_pessoa_entregadora)",
+    ),
+    (
+        "imports_sha256_idx", "imports", ("sha256",),
+        "create index concurrently if not exists {nome} on public.{tabela} (sha256)",
+    ),
+    (
+        "imports_file_name_idx", "imports", ("file_name",),
+        "create index concurrently if not exists {nome} on public.{tabela} (file_name)",
+    ),
+    (
+        "imports_source_name_idx", "imports", ("source_name",),
+        "create index concurrently if not exists {nome} on public.{tabela} (source_name)",
+    ),
+    (
+        "audit_log_ts_id_idx", "audit_log", ("ts", "id"),
+        "create index concurrently if not exists {nome} on public.{tabela} (ts desc, id desc)",
+    ),
+    (
+        "audit_log_ts_idx", "audit_log", ("ts", "!id"),
+        "create index concurrently if not exists {nome} on public.{tabela} (ts desc)",
+    ),
+    (
+        "app_users_nome_login_idx", "app_users", ("full_name", "login", "id"),
+        "create index concurrently if not exists {nome} "
+        "on public.{tabela} (lower(coalesce(full_name, '')), lower(login), id)",
+    ),
+    (
+        "audit_log_actor_user_ts_idx", "audit_log", ("actor_user_id", "ts"),
+        "create index concurrently if not exists {nome} on public.{tabela} (actor_user_id, ts desc)",
+    ),
+    (
+        "audit_log_actor_ts_idx", "audit_log", ("actor_login", "ts"),
+        "create index concurrently if not exists {nome} on public.{tabela} (actor_login, ts desc)",
+    ),
+    (
+        "audit_log_action_ts_idx", "audit_log", ("action", "ts"),
+        "create index concurrently if not exists {nome} on public.{tabela} (action, ts desc)",
+    ),
+    (
+        "audit_log_entity_ts_idx", "audit_log", ("entity", "entity_id", "ts"),
+        "create index concurrently if not exists {nome} on public.{tabela} (entity, entity_id, ts desc)",
+    ),
+    (
+        "audit_log_metadata_gin", "audit_log", ("metadata",),
+        "create index concurrently if not exists {nome} on public.{tabela} using gin (metadata)",
+    ),
+]
+
+
+def _estado_indice(conn, nome: str) -> str | None:
+    """'valido', 'invalido' (concurrently que falhou no meio) ou None se não existe."""
+    row = conn.execute(
+        """
+        select i.indisvalid
+        from pg_index i
+        where i.indexrelid = to_regclass(%s)
+        """,
+        (f"public.{nome}",),
+    ).fetchone()
+    if row is None:
+        return None
+    return "valido" if row[0] else "invalido"
+
+
+def ensure_tables(conn) -> dict:
+    """
+    Tabela tipada e cubo diário: cria o que falta e faz o backfill (a
+    primeira vez copia a RAW toda). Devolve {"tipada": linhas, "cubo": linhas}.
+    """
+    tipada = ensure_clean_table(conn)
+    cubo = ensure_daily_table(conn)
+    return {"tipada": tipada, "cubo": cubo}
+
+
+def ensure_indexes(conn) -> dict:
+    """
+    Cria o que falta (concurrently: não trava insert na RAW) e devolve o
+    relatório {"criados", "existentes", "ignorados", "falhas"}.
+    Índice inválido (criação interrompida) é recriado. Tabela/coluna que
+    não existe no schema fica em "ignorados"; erro (ex.: duplicado na
+    chave única, sem permissão) fica em "falhas" e não impede os outros.
+    """
+    relatorio = {"criados": [], "existentes": [], "ignorados": [], "falhas": []}
+
+    # create index concurrently não roda dentro de transação
+    conn.commit()
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        for nome, tabela, precisa, ddl in INDICES:
+            cols = set(table_columns(conn, tabela))
+            exige = {c for c in precisa if not c.startswith("!")}
+            proibe = {c[1:] for c in precisa if c.startswith("!")}
+            if not cols or not exige <= cols or proibe & cols:
+                relatorio["ignorados"].append(nome)
+                continue
+
+            estado = _estado_indice(conn, nome)
+            if estado == "valido":
+                relatorio["existentes"].append(nome)
+                continue
+
+            try:
+                if estado == "invalido":
+                    conn.execute(f"drop index concurrently if exists public.{nome}")
+                conn.execute(ddl.format(nome=nome, tabela=tabela))
+                relatorio["criados"].append(nome)
+            except Exception as e:
+                relatorio["falhas"].append(f"{nome}: {e}")
+    finally:
+        conn.autocommit = autocommit
+
+    return relatorio
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_indexes_in_background() -> dict:
+    """
+    Dispara ensure_tables + ensure_indexes numa thread, 1x por processo, e
+    volta na hora. Estado: {"tabelas": dict | None, "relatorio": dict | None
+    (None = rodando), "erro": str | None}.
+    """
+    estado = {"tabelas": None, "relatorio": None, "erro": None}
+
+    def _rodar():
+        try:
+            with db_conn() as conn:
+                estado["tabelas"] = ensure_tables(conn)
+                estado["relatorio"] = ensure_indexes(conn)
+        except BaseException as e:  # thread sem sessão: nada de st.error aqui
+            _log.exception("bootstrap do banco (tabelas/índices) falhou")
+            estado["erro"] = repr(e)
+
+    threading.Thread(target=_rodar, name="painel-indices", daemon=True).start()
+    return estado
+
+
+if __name__ == "__main__":
+    with db_conn() as conn:
+        tabelas = ensure_tables(conn)
+        print(f"tipada: {tabelas['tipada']} linhas copiadas; cubo: {tabelas['cubo']} linhas gravadas")
+        rel = ensure_indexes(conn)
+    for chave in ("criados", "existentes", "ignorados", "falhas"):
+        print(f"{chave}: {', '.join(rel[chave]) or '—'}")
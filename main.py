@@ -3,7 +3,8 @@ import pandas as pd
 import streamlit as st
 
 from auth import autenticar
-from data_loader import carregar_dados
+from data_loader import carregar_dados, geracao_base, ultimo_dia
+from db_bootstrap import ensure_indexes_in_background
 
 
 # ---------------- Config ----------------
@@ -25,11 +26,15 @@ def inject_css():
 
 inject_css()
 
+# índices do banco (db_bootstrap): 1x por processo, numa thread; não segura o render
+try:
+    ensure_indexes_in_background()
+except Exception:
+    pass
+
 
-def get_df_once():
-    force = st.session_state.pop("force_refresh", False)
-    ts = pd.Timestamp.now().timestamp() if force else None
-    return carregar_dados(prefer_drive=False, _ts=ts)
+def get_df_once(grupos=None):
+    return carregar_dados(prefer_drive=False, grupos=grupos)
 
 
 def _pick_col(cols, candidates):
@@ -40,7 +45,11 @@ def _pick_col(cols, candidates):
 
 
 def _last_date_str(df: pd.DataFrame) -> str:
-    if df is None or df.empty:
+    if df is None:
+        # página de escopo mensal: não tem a base inteira, pergunta pro loader
+        dtmax = ultimo_dia()
+        return dtmax.strftime("%d/%m/%Y") if pd.notna(dtmax) else ""
+    if df.empty:
         return ""
     col = _pick_col(list(df.columns), ["data_do_periodo", "data", "Data", "DATA", "dt", "timestamp", "ts"])
     if not col:
@@ -104,13 +113,16 @@ def _render_topbar(df: pd.DataFrame):
         with c4:
             with st.popover("≡", use_container_width=True):
                 if st.session_state.get("is_admin"):
-                    a1, a2 = st.columns(2)
+                    a1, a2, a3 = st.columns(3)
                     with a1:
                         if st.button("Usuários", use_container_width=True, key="pop_admin_users"):
                             _goto("views.admin_usuarios", None)
                     with a2:
                         if st.button("Auditoria", use_container_width=True, key="pop_admin_audit"):
                             _goto("views.auditoria", None)
+                    with a3:
+                        if st.button("Memória", use_container_width=True, key="pop_admin_mem"):
+                            _goto("views.memoria", None)
                 else:
                     st.caption("Sem opções de admin.")
 
@@ -208,8 +220,33 @@ if st.session_state.pop("show_welcome", False):
         st.info(msg)
 
 
+# ---------------- Página ----------------
+try:
+    page = importlib.import_module(st.session_state.module)
+    page_err = None
+except Exception as e:
+    page, page_err = None, e
+
+
 # ---------------- Dados ----------------
-df = get_df_once()
+# cada view declara GRUPOS (grupos opcionais de colunas que lê, contrato em
+# data_loader.GRUPOS_COLUNAS); sem declaração = base completa.
+# CARREGA_BASE = False: a página busca só o recorte dela (data_loader.carregar_periodo)
+if page is not None and not getattr(page, "CARREGA_BASE", True):
+    df = None
+else:
+    df = get_df_once(getattr(page, "GRUPOS", None) if page is not None else ())
+
+
+# base nova trocada em background desde o último render desta sessão
+_geracao = geracao_base()
+_vista = st.session_state.get("base_geracao")
+st.session_state["base_geracao"] = _geracao
+if _vista is not None and _geracao != _vista and hasattr(st, "toast"):
+    try:
+        st.toast("🔄 Dados atualizados")
+    except Exception:
+        pass
 
 
 # ---------------- Topbar ----------------
@@ -217,9 +254,7 @@ _render_topbar(df)
 
 
 # ---------------- Roteador ----------------
-try:
-    page = importlib.import_module(st.session_state.module)
-except Exception as e:
-    st.error(f"Erro ao carregar módulo **{st.session_state.module}**: {e}")
+if page_err is not None:
+    st.error(f"Erro ao carregar módulo **{st.session_state.module}**: {page_err}")
 else:
     page.render(df, {})
@@ -1,6 +1,9 @@
 # relatorios.py
 
-from utils import normalizar, tempo_para_segundos, calcular_tempo_online
+from utils import (
+    normalizar_nome, fatiar_mes, indices_por_valor, tempo_para_segundos_serie, calcular_tempo_online,
+    coluna_nome_normalizado,
+)
 from datetime import datetime, timedelta, date
 import pandas as pd
 
@@ -44,10 +47,9 @@ Corridas:
 
 
 def gerar_dados(nome, mes, ano, df):
-    nome_norm = normalizar(nome)
-    dados = df[(df["pessoa_entregadora_normalizado"] == nome_norm)]
-    if mes and ano:
-        dados = dados[(dados["mes"] == mes) & (dados["ano"] == ano)]
+    nome_norm = normalizar_nome(nome)
+    dados = fatiar_mes(df, ano, mes) if (mes and ano) else df
+    dados = dados[coluna_nome_normalizado(dados) == nome_norm]
     if dados.empty:
         return None
 
@@ -96,12 +98,9 @@ def gerar_simplicado(nome, mes, ano, df):
     """
     Gera bloco simplificado para WhatsApp, sem emoji.
     """
-    nome_norm = normalizar(nome)
-    dados = df[
-        (df["pessoa_entregadora_normalizado"] == nome_norm)
-        & (df["mes"] == mes)
-        & (df["ano"] == ano)
-    ]
+    nome_norm = normalizar_nome(nome)
+    dados = fatiar_mes(df, ano, mes)
+    dados = dados[coluna_nome_normalizado(dados) == nome_norm]
 
     meses_pt = [
         "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
@@ -143,8 +142,9 @@ def gerar_alertas_de_faltas(df):
     ativos = df[df["data"] >= ultimos_15_dias]["pessoa_entregadora_normalizado"].unique()
     mensagens = []
 
+    pos = indices_por_valor(df, "pessoa_entregadora_normalizado")
     for nome in ativos:
-        entregador = df[df["pessoa_entregadora_normalizado"] == nome]
+        entregador = df.iloc[pos.get(nome, [])]
         if entregador.empty:
             continue
         dias = pd.date_range(end=hoje - timedelta(days=1), periods=30).date
@@ -160,12 +160,14 @@ def gerar_alertas_de_faltas(df):
     return mensagens
 
 
-def gerar_por_praca_data_turno(df, nome=None, praca=None, data_inicio=None, data_fim=None, turno=None, datas_especificas=None):
+def gerar_por_praca_data_turno(
+    df, nome=None, praca=None, data_inicio=None, data_fim=None, turno=None, datas_especificas=None
+):
     df = df.copy()
 
     if nome:
-        nome_norm = normalizar(nome)
-        df = df[df["pessoa_entregadora_normalizado"] == nome_norm]
+        nome_norm = normalizar_nome(nome)
+        df = df[coluna_nome_normalizado(df) == nome_norm]
 
     if praca:
         df = df[df["praca"] == praca]
@@ -190,7 +192,7 @@ def gerar_por_praca_data_turno(df, nome=None, praca=None, data_inicio=None, data
 def _sh_mensal(dados: pd.DataFrame) -> float:
     if "tempo_disponivel_absoluto" not in dados.columns:
         return 0.0
-    segundos = dados["tempo_disponivel_absoluto"].apply(tempo_para_segundos).sum()
+    segundos = tempo_para_segundos_serie(dados["tempo_disponivel_absoluto"]).sum()
     return round(segundos / 3600.0, 1)
 
 
@@ -248,9 +250,9 @@ def _categoria(sh: float, comp_pct: float, acc_pct: float) -> tuple[str, int, st
 
 
 def classificar_entregadores(df: pd.DataFrame, mes: int | None = None, ano: int | None = None) -> pd.DataFrame:
-    dados = df.copy()
+    dados = df
     if mes is not None and ano is not None:
-        dados = dados[(dados["mes"] == mes) & (dados["ano"] == ano)]
+        dados = fatiar_mes(dados, ano, mes)
     if dados.empty:
         return pd.DataFrame(columns=[
             "pessoa_entregadora","supply_hours","aceitacao_%","conclusao_%",
@@ -291,7 +293,7 @@ def classificar_entregadores(df: pd.DataFrame, mes: int | None = None, ano: int
 def _horas_from_abs(df_chunk):
     if "tempo_disponivel_absoluto" not in df_chunk.columns:
         return 0.0
-    seg = df_chunk["tempo_disponivel_absoluto"].apply(tempo_para_segundos).sum()
+    seg = tempo_para_segundos_serie(df_chunk["tempo_disponivel_absoluto"]).sum()
     return seg / 3600.0
 
 
@@ -305,7 +307,7 @@ def _horas_para_hms(horas_float):
 def utr_por_entregador_turno(df, mes=None, ano=None):
     dados = df
     if mes is not None and ano is not None:
-        dados = dados[(dados["mes"] == mes) & (dados["ano"] == ano)]
+        dados = fatiar_mes(dados, ano, mes)
     if dados.empty:
         return pd.DataFrame(columns=[
             "data","pessoa_entregadora","periodo","tempo_hms","supply_hours",
@@ -314,14 +316,16 @@ def utr_por_entregador_turno(df, mes=None, ano=None):
 
     if "periodo" not in dados.columns:
         dados = dados.assign(periodo="(sem turno)")
+    if "segundos_abs" not in dados.columns:
+        # converte a coluna toda de uma vez, em vez de .apply por grupo
+        dados = dados.assign(segundos_abs=tempo_para_segundos_serie(dados["tempo_disponivel_absoluto"]))
 
     g = (
         dados
         .groupby(["pessoa_entregadora", "periodo", "data"], dropna=False)
         .agg(
             corridas_ofertadas=("numero_de_corridas_ofertadas", "sum"),
-            segundos=("segundos_abs", "sum") if "segundos_abs" in dados.columns
-                    else ("tempo_disponivel_absoluto", lambda s: s.apply(tempo_para_segundos).sum())
+            segundos=("segundos_abs", "sum"),
         )
         .reset_index()
     )
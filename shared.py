@@ -66,7 +66,7 @@ def apply_sub_filter(df_base: pd.DataFrame, selecionadas: list[str], praca_scope
         mask |= subs.isin(reais)
 
     if "LIVRE" in selecionadas:
-        mask |= ((praca == praca_scope) & (subs.isna()))
+        mask |= ((praca == praca_scope) & (subs.isna())).fillna(False)
 
     return df_base[mask]
 
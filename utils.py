@@ -1,5 +1,8 @@
+import re
 import pandas as pd
+import numpy as np
 import unicodedata
+from functools import lru_cache
 
 # ---------------------------------------------------------
 # Normalização de texto
@@ -17,6 +20,73 @@ def normalizar(texto):
     )
 
 
+@lru_cache(maxsize=65536)
+def normalizar_nome(texto):
+    """normalizar() com memo: os mesmos nomes se repetem o tempo todo."""
+    return normalizar(texto)
+
+
+def normalizar_serie(s: pd.Series) -> pd.Series:
+    """
+    Normaliza uma coluna inteira chamando normalizar() uma vez por nome
+    distinto (factorize -> normaliza os únicos -> mapeia de volta).
+    Nulos viram "" (igual normalizar).
+    """
+    codigos, unicos = pd.factorize(s, use_na_sentinel=True)
+    # último slot = "" pros nulos (código -1)
+    norm = np.array([normalizar_nome(str(u)) for u in unicos] + [""], dtype=object)
+    return pd.Series(norm[codigos], index=s.index)
+
+
+def coluna_nome_normalizado(df: pd.DataFrame) -> pd.Series:
+    """pessoa_entregadora_normalizado já vem do loader; se faltar, calcula."""
+    if "pessoa_entregadora_normalizado" in df.columns:
+        return df["pessoa_entregadora_normalizado"]
+    return normalizar_serie(df["pessoa_entregadora"])
+
+
+# ---------------------------------------------------------
+# Recorte por mês
+# ---------------------------------------------------------
+def fatiar_meses(df: pd.DataFrame, inicio, fim=None) -> pd.DataFrame:
+    """
+    Linhas com mes_ano entre os meses `inicio` e `fim` (inclusivo; fim=None
+    = só o mês de inicio). A base do loader vem ordenada por mes_ano (e
+    qualquer filtro em cima dela mantém a ordem): aí é busca binária +
+    fatia contígua, sem varrer/copiar a coluna. Senão cai na máscara.
+    """
+    ini = pd.Timestamp(inicio).to_period("M").to_timestamp()
+    fim = ini if fim is None else pd.Timestamp(fim).to_period("M").to_timestamp()
+    prox = fim + pd.offsets.MonthBegin(1)
+
+    if "mes_ano" not in df.columns:
+        k = pd.to_numeric(df["ano"], errors="coerce") * 12 + pd.to_numeric(df["mes"], errors="coerce")
+        return df[(k >= ini.year * 12 + ini.month) & (k <= fim.year * 12 + fim.month)]
+
+    s = df["mes_ano"]
+    if s.is_monotonic_increasing:
+        v = s.to_numpy()
+        a = np.searchsorted(v, ini.to_datetime64(), side="left")
+        b = np.searchsorted(v, prox.to_datetime64(), side="left")
+        return df.iloc[a:b]
+    return df[(s >= ini) & (s < prox)]
+
+
+def fatiar_mes(df: pd.DataFrame, ano: int, mes: int) -> pd.DataFrame:
+    """Atalho do fatiar_meses pra um mês."""
+    return fatiar_meses(df, pd.Timestamp(int(ano), int(mes), 1))
+
+
+def indices_por_valor(df: pd.DataFrame, col: str) -> dict:
+    """
+    valor -> posições (iloc) das linhas de df com esse valor. Uma passada
+    só; depois cada df.iloc[pos] é O(k) em vez de varrer df por nome.
+    """
+    if df is None or df.empty or col not in df.columns:
+        return {}
+    return df.groupby(col, sort=False, dropna=True).indices
+
+
 # ---------------------------------------------------------
 # Conversão de tempo (HH:MM:SS → segundos)
 # ---------------------------------------------------------
@@ -49,6 +119,32 @@ def tempo_para_segundos(t):
             return 0
 
 
+def _float_array(x) -> np.ndarray:
+    """to_numeric -> numpy float64 (nulo/lixo = NaN, inf = NaN)."""
+    a = pd.to_numeric(x, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    # sem atribuir in place: com copy-on-write o to_numpy pode vir read-only
+    return np.where(np.isfinite(a), a, np.nan)
+
+
+def tempo_para_segundos_serie(serie) -> pd.Series:
+    """
+    Versão em lote do tempo_para_segundos (mesmo resultado, sem .apply por
+    linha): a coluna tem poucos valores distintos (durações repetem muito),
+    então converte só os únicos com o próprio tempo_para_segundos e espalha
+    de volta pelos códigos do factorize. Nulo -> 0.
+    """
+    s = pd.Series(serie)
+    if pd.api.types.is_numeric_dtype(s):
+        total = np.nan_to_num(np.trunc(_float_array(s)), nan=0.0)
+        return pd.Series(total.astype("int64"), index=s.index)
+
+    codigos, unicos = pd.factorize(s, use_na_sentinel=True)
+    valores = np.fromiter((tempo_para_segundos(u) for u in unicos), dtype="int64", count=len(unicos))
+    # sentinela -1 (nulo) cai no 0 do fim
+    valores = np.append(valores, 0)
+    return pd.Series(valores[codigos], index=s.index)
+
+
 # ---------------------------------------------------------
 # Cálculo de tempo online (%)
 # ---------------------------------------------------------
@@ -119,7 +215,7 @@ def mask_entregador_ativo(df: pd.DataFrame, min_seg: int = 9 * 60 + 59) -> pd.Se
     elif "segundos_abs" in df.columns:
         secs = pd.to_numeric(df.get("segundos_abs"), errors="coerce").fillna(0)
     elif "tempo_disponivel_absoluto" in df.columns:
-        secs = pd.to_numeric(df["tempo_disponivel_absoluto"].apply(tempo_para_segundos), errors="coerce").fillna(0)
+        secs = tempo_para_segundos_serie(df["tempo_disponivel_absoluto"])
     else:
         secs = pd.Series([0] * len(df), index=df.index, dtype=float)
 
@@ -138,15 +234,15 @@ def _entregador_key(df: pd.DataFrame) -> pd.Series:
     """
     for col in ("uuid", "id_da_pessoa_entregadora"):
         if col in df.columns:
-            s = df[col].astype(str).fillna("").str.strip()
+            s = df[col].fillna("").astype(str).str.strip()
             if (s != "").any():
                 return s
 
     if "pessoa_entregadora_normalizado" in df.columns:
-        return df["pessoa_entregadora_normalizado"].astype(str).fillna("").str.strip()
+        return df["pessoa_entregadora_normalizado"].fillna("").astype(str).str.strip()
 
     if "pessoa_entregadora" in df.columns:
-        return df["pessoa_entregadora"].astype(str).fillna("").str.strip()
+        return df["pessoa_entregadora"].fillna("").astype(str).str.strip()
 
     return pd.Series([""] * len(df), index=df.index, dtype="string")
 
@@ -156,24 +252,46 @@ def mask_turno_valido(df: pd.DataFrame, min_seg: int = TURNO_VALIDO_MIN_SEG) ->
     return secs >= float(min_seg)
 
 
-def _coerce_ptbr_number(series: pd.Series) -> pd.Series:
+# número PT-BR: sinal, inteiro (com ou sem milhar '.') e decimal opcional ','
+_RE_NUM_PTBR = re.compile(r"^([+-]?)(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d+))?$")
+
+
+def _numero_ptbr(v) -> float:
+    """Um valor de numero_ptbr_serie (que só chama isso nos valores únicos)."""
+    t = str(v).strip()
+    m = _RE_NUM_PTBR.match(t)
+    if m:
+        sinal, inteiro, dec = m.groups()
+        t = f"{sinal}{inteiro.replace('.', '')}.{dec or '0'}"
+    elif "_" in t:  # float() aceita '1_000', o to_numeric não
+        return 0.0
+    try:
+        x = float(t)
+    except ValueError:
+        return 0.0
+    return 0.0 if x != x else x  # 'nan' -> 0
+
+
+def numero_ptbr_serie(series: pd.Series) -> pd.Series:
     """
-    Converte string numérica PT-BR para float:
+    Converte texto numérico PT-BR pra float:
       - '4.118,10' -> 4118.10
       - '1.234' -> 1234
       - '12,5' -> 12.5
+      - o que não é PT-BR vai direto como número ('12.5', '3', '1e3')
+      - vazio / lixo -> 0
+    Contadores e taxas repetem muito: converte só os valores únicos
+    (factorize) e espalha de volta pelos códigos.
+    Coluna já numérica volta só com fillna(0).
     """
-    v = series.astype("string").str.strip()
-    v = v.replace({"": pd.NA, "nan": pd.NA, "NaN": pd.NA})
-
-    # remove separador de milhar quando parece padrão pt-BR
-    mask_thou = v.str.match(r"^\d{1,3}(\.\d{3})+(,\d+)?$")
-    v = v.where(~mask_thou, v.str.replace(".", "", regex=False))
-
-    # troca vírgula por ponto (decimal)
-    v = v.str.replace(",", ".", regex=False)
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(series, errors="coerce").fillna(0.0)
 
-    return pd.to_numeric(v, errors="coerce").fillna(0.0)
+    codigos, unicos = pd.factorize(series, use_na_sentinel=True)
+    valores = np.fromiter((_numero_ptbr(u) for u in unicos), dtype="float64", count=len(unicos))
+    # sentinela -1 (nulo) cai no 0 do fim
+    valores = np.append(valores, 0.0)
+    return pd.Series(valores[codigos], index=series.index)
 
 
 def calcular_aderencia(
@@ -195,11 +313,12 @@ def calcular_aderencia(
             + ["vagas", "vagas_inconsistente", "regulares_atuaram", "aderencia_pct"]
         )
 
-    dfx = df.copy()
+    dfx = df.copy(deep=False)
 
     # ✅ FIX: vagas pode vir como texto do Supabase RAW (ex: "4.118,10")
     if vagas_col in dfx.columns and not pd.api.types.is_numeric_dtype(dfx[vagas_col]):
-        dfx[vagas_col] = _coerce_ptbr_number(dfx[vagas_col])
+        # o loader já entrega numérico; isso só roda pra df montado fora dele
+        dfx[vagas_col] = numero_ptbr_serie(dfx[vagas_col])
 
     # valida colunas mínimas
     for c in group_cols:
@@ -213,7 +332,7 @@ def calcular_aderencia(
 
     dfx["_key"] = _entregador_key(dfx)
     dfx["_turno_valido"] = mask_turno_valido(dfx, min_seg=min_seg)
-    dfx["_tag"] = dfx[tag_col].astype(str).fillna("").str.strip().str.upper()
+    dfx["_tag"] = dfx[tag_col].fillna("").astype(str).str.strip().str.upper()
 
     gcols = list(group_cols)
 
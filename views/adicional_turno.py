@@ -30,6 +30,11 @@ def _fmt_moeda(x: float) -> str:
 # ================================
 # VIEW PRINCIPAL
 # ================================
+
+
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
 
     st.header("💰 Adicional por Hora — Detalhado por Turno")
@@ -4,7 +4,7 @@ import secrets
 import pandas as pd
 import streamlit as st
 
-from db import db_conn, audit_log
+from db import db_conn, audit_log, approx_count
 from auth import require_admin, canon_login, hash_password
 
 
@@ -15,6 +15,7 @@ PAGE_SIZE = 40
 # views
 K_VIEW = "adm_users_view"  # "list" | "create"
 K_PAGE = "adm_users_page"
+K_CURSORS = "adm_users_cursors"  # chave de ordenação da última linha de cada página já vista
 
 # criar usuário
 K_C_NAME = "adm_create_full_name"
@@ -62,27 +63,35 @@ def _fmt_dt(x):
         return str(x)
 
 
-def _fetch_users_page(conn, page: int):
-    offset = page * PAGE_SIZE
-    sql = """
+def _fetch_users_page(conn, apos):
+    """
+    Página por cursor (keyset) na ordem nome/login: linhas depois de `apos`
+    (chave da última linha da página anterior). Sem OFFSET nem count(*) over().
+    Nome nulo entra como '' (senão a comparação de tupla dá NULL e some).
+    Devolve (has_next, rows, chave da última linha).
+    """
+    where, params = "", []
+    if apos is not None:
+        where = "where (lower(coalesce(full_name, '')), lower(login), id) > (%s, %s, %s)"
+        params = list(apos)
+
+    sql = f"""
     select
       id, login, full_name, department, is_admin, is_active, must_change_password, last_login_at,
-      count(*) over() as total_count
+      lower(coalesce(full_name, '')), lower(login)
     from public.app_users
-    order by lower(full_name), lower(login)
-    limit %s offset %s
+    {where}
+    order by lower(coalesce(full_name, '')), lower(login), id
+    limit %s
     """
     with conn.cursor() as cur:
-        cur.execute(sql, (PAGE_SIZE + 1, offset))
+        cur.execute(sql, params + [PAGE_SIZE + 1])
         rows = cur.fetchall()
 
-    if not rows:
-        return 0, False, []
-
-    total = int(rows[0][-1] or 0)
     has_next = len(rows) > PAGE_SIZE
-    rows = [r[:-1] for r in rows[:PAGE_SIZE]]
-    return total, has_next, rows
+    rows = rows[:PAGE_SIZE]
+    ultima = (rows[-1][8], rows[-1][9], rows[-1][0]) if rows else None
+    return has_next, [r[:8] for r in rows], ultima
 
 
 def _goto_profile(user_id: str):
@@ -200,6 +209,7 @@ def _render_create_view():
                 st.stop()
 
     audit_log("user_created", "app_users", str(new_id), {"login": login2, "department": dept, "is_admin": is_admin})
+    approx_count.clear()  # rodapé da lista já com o novo usuário
     st.success("Usuário criado!")
 
     if st.button("Voltar pra lista", use_container_width=True):
@@ -219,13 +229,22 @@ def _render_list_view():
             st.session_state[K_VIEW] = "create"
             st.rerun()
 
+    cursores = st.session_state.setdefault(K_CURSORS, [])
     page = max(0, int(st.session_state.get(K_PAGE, 0)))
+    if page > len(cursores):
+        page = 0
+        st.session_state[K_PAGE] = 0
 
     with db_conn() as conn:
         with st.spinner("Carregando usuários…"):
-            total, has_next, rows = _fetch_users_page(conn, page)
+            has_next, rows, ultima = _fetch_users_page(conn, cursores[page - 1] if page > 0 else None)
+    total = approx_count("app_users")
+
+    if not rows and page > 0:
+        st.session_state[K_PAGE] = page - 1
+        st.rerun()
 
-    if total == 0:
+    if not rows:
         st.info("Nenhum usuário encontrado.")
         return
 
@@ -291,10 +310,14 @@ def _render_list_view():
         )
     with right:
         if st.button("➡️", disabled=(not has_next), key="btn_users_next"):
+            st.session_state[K_CURSORS] = cursores[:page] + [ultima]
             st.session_state[K_PAGE] = page + 1
             st.rerun()
 
 
+GRUPOS = ()
+
+
 def render(_df, _USUARIOS):
     require_admin()
     _init_defaults()
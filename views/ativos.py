@@ -7,10 +7,11 @@ from io import BytesIO
 from shared import sub_options_with_livre, apply_sub_filter
 from utils import (
     calcular_tempo_online,
-    tempo_para_segundos,
+    tempo_para_segundos_serie,
     calcular_aderencia,
     mask_entregador_ativo,
     entregador_key,
+    indices_por_valor,
 )
 
 
@@ -36,8 +37,7 @@ def _turno_valido_mask(df: pd.DataFrame) -> pd.Series:
     elif "segundos_abs" in df.columns:
         sec = pd.to_numeric(df["segundos_abs"], errors="coerce").fillna(0)
     elif "tempo_disponivel_absoluto" in df.columns:
-        sec = df["tempo_disponivel_absoluto"].apply(tempo_para_segundos)
-        sec = pd.to_numeric(sec, errors="coerce").fillna(0)
+        sec = tempo_para_segundos_serie(df["tempo_disponivel_absoluto"])
     else:
         sec = pd.Series([0] * len(df), index=df.index, dtype=float)
 
@@ -48,7 +48,7 @@ def _turno_valido_mask(df: pd.DataFrame) -> pd.Series:
 # Helpers
 # ------------------------------
 def _ensure_datetime(df: pd.DataFrame) -> pd.DataFrame:
-    d = df.copy()
+    d = df.copy(deep=False)
     if "data" in d.columns:
         d["data"] = pd.to_datetime(d["data"], errors="coerce")
     elif "data_do_periodo" in d.columns:
@@ -60,13 +60,13 @@ def _ensure_datetime(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def _ensure_uuid(df: pd.DataFrame) -> pd.DataFrame:
-    d = df.copy()
+    d = df.copy(deep=False)
     if "uuid" not in d.columns:
         if "id_da_pessoa_entregadora" in d.columns:
-            d["uuid"] = d["id_da_pessoa_entregadora"].astype(str)
+            d["uuid"] = d["id_da_pessoa_entregadora"].fillna("").astype(str)
         else:
             d["uuid"] = ""
-    d["uuid"] = d["uuid"].astype(str)
+    d["uuid"] = d["uuid"].fillna("").astype(str)
     return d
 
 
@@ -223,7 +223,7 @@ def _kpis(df_slice: pd.DataFrame) -> dict:
 
     utr_abs = (ofe / horas) if horas > 0 else 0.0
 
-    df_ok = df_slice.copy()
+    df_ok = df_slice.copy(deep=False)
     df_ok["segundos_abs"] = pd.to_numeric(df_ok.get("segundos_abs", 0), errors="coerce").fillna(0)
     df_ok["numero_de_corridas_ofertadas"] = pd.to_numeric(
         df_ok.get("numero_de_corridas_ofertadas", 0), errors="coerce"
@@ -266,7 +266,7 @@ def _kpis(df_slice: pd.DataFrame) -> dict:
 
 
 def _agg_individual(df_sel: pd.DataFrame) -> pd.DataFrame:
-    base = df_sel.copy()
+    base = df_sel.copy(deep=False)
     base["_turno_ok"] = _turno_valido_mask(base).astype(int)
 
     base["data"] = pd.to_datetime(base["data"], errors="coerce")
@@ -302,8 +302,9 @@ def _agg_individual(df_sel: pd.DataFrame) -> pd.DataFrame:
     agg["UTR_abs"] = np.where(agg["horas"] > 0, agg["ofertadas"] / agg["horas"], 0.0)
 
     online_vals = []
+    pos = indices_por_valor(df_sel, "pessoa_entregadora")
     for nome in agg["pessoa_entregadora"].tolist():
-        chunk = df_sel[df_sel["pessoa_entregadora"] == nome].copy()
+        chunk = df_sel.iloc[pos.get(nome, [])].copy()
         online_vals.append(float(calcular_tempo_online(chunk)))
     agg["tempo_online_%"] = online_vals
 
@@ -333,6 +334,11 @@ def _to_whatsapp_text(df_ind: pd.DataFrame, titulo: str) -> str:
 # ------------------------------
 # View principal
 # ------------------------------
+
+
+GRUPOS = ("escala",)
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("📑 Relatórios")
 
@@ -368,7 +374,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
 
     periodo = f3.date_input("Período", [data_min, data_max], format="DD/MM/YYYY", key="ru_periodo")
 
-    df_sel = base.copy()
+    df_sel = base.copy(deep=False)
 
     if isinstance(periodo, (list, tuple)) and len(periodo) == 2:
         ini = pd.to_datetime(periodo[0])
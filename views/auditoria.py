@@ -1,10 +1,11 @@
 import json
+from datetime import datetime, time, timedelta
 from zoneinfo import ZoneInfo
 
 import pandas as pd
 import streamlit as st
 
-from db import db_conn
+from db import approx_count, audit_flush, audit_order_cols, db_conn
 from auth import require_admin
 
 
@@ -13,27 +14,109 @@ TZ_UTC = ZoneInfo("UTC")
 
 PAGE_SIZE = 30
 K_PAGE = "audit_page"
+K_CURSORS = "audit_cursors"  # chave (ts[, id]) da última linha de cada página já vista
+K_FILTROS = "audit_filtros"  # filtros da última listagem (mudou -> volta pra página 1)
 
+META_LIMIT = 2000  # metadata cortado no banco (não trafega blob inteiro)
 
-def _safe_json(x):
-    if x is None:
-        return {}
-    if isinstance(x, (dict, list)):
-        return x
-    s = str(x)
+
+def _valor_json(txt: str):
+    """Valor digitado na busca do metadata: JSON se for (número, true...), senão texto."""
     try:
-        return json.loads(s)
+        return json.loads(txt)
     except Exception:
-        return {"raw": s}
+        return txt
+
+
+def _render_filtros() -> dict:
+    """Filtros da tela -> dict (vazio = sem filtro). Tudo vira WHERE no banco."""
+    with st.expander("🔎 Filtros", expanded=False):
+        a, b, c, d = st.columns(4)
+        actor = a.text_input("Quem fez (login)").strip().lower()
+        action = b.text_input("Ação").strip()
+        entity = c.text_input("Entidade").strip()
+        entity_id = d.text_input("ID").strip()
+
+        e, f, g, h = st.columns(4)
+        ini = e.date_input("De", value=None, format="DD/MM/YYYY")
+        fim = f.date_input("Até", value=None, format="DD/MM/YYYY")
+        meta_key = g.text_input("Metadata: chave").strip()
+        meta_val = h.text_input("Metadata: valor (opcional)").strip()
+
+    filtros = {
+        "actor": actor,
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "ini": ini,
+        "fim": fim,
+        "meta_key": meta_key,
+        "meta_val": meta_val if meta_key else "",
+    }
+    return {k: v for k, v in filtros.items() if v}
+
+
+def _where_filtros(filtros: dict) -> tuple[list[str], list]:
+    """Filtros -> condições SQL (cada uma coberta por um índice do db_bootstrap)."""
+    conds, params = [], []
+    for campo, col in (("actor", "actor_login"), ("action", "action"), ("entity", "entity"), ("entity_id", "entity_id")):
+        if campo in filtros:
+            conds.append(f"{col} = %s")
+            params.append(filtros[campo])
+
+    # datas no fuso de SP -> limites em UTC
+    if "ini" in filtros:
+        conds.append("ts >= %s")
+        params.append(datetime.combine(filtros["ini"], time.min, TZ_LOCAL).astimezone(TZ_UTC))
+    if "fim" in filtros:
+        conds.append("ts < %s")
+        params.append(datetime.combine(filtros["fim"] + timedelta(days=1), time.min, TZ_LOCAL).astimezone(TZ_UTC))
+
+    if "meta_val" in filtros:
+        conds.append("metadata @> %s::jsonb")
+        params.append(json.dumps({filtros["meta_key"]: _valor_json(filtros["meta_val"])}, ensure_ascii=False))
+    elif "meta_key" in filtros:
+        conds.append("metadata ? %s")
+        params.append(filtros["meta_key"])
+    return conds, params
+
+
+def _fetch_page(conn, filtros: dict, apos):
+    """
+    Página por cursor (keyset): linhas que passam nos filtros, depois de
+    `apos` na ordem ts desc. Usa os índices (ts desc[, id desc] e os dos
+    filtros): a página 500 custa o mesmo que a 1ª.
+    Metadata já vem como texto cortado em META_LIMIT.
+    Devolve (rows, chaves) com uma linha a mais pra saber se tem próxima.
+    """
+    ordem = audit_order_cols(conn)
+    conds, params = _where_filtros(filtros)
+    if apos is not None:
+        conds.append(f"({', '.join(ordem)}) < ({', '.join(['%s'] * len(ordem))})")
+        params += list(apos)
+    where = ("where " + " and ".join(conds)) if conds else ""
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            select
+              ts, actor_login, action, entity, entity_id,
+              case when length(metadata::text) > %s
+                   then left(metadata::text, %s) || '…'
+                   else coalesce(metadata::text, '{{}}') end,
+              {", ".join(ordem)}
+            from public.audit_log
+            {where}
+            order by {", ".join(f"{c} desc" for c in ordem)}
+            limit %s
+            """,
+            [META_LIMIT, META_LIMIT] + params + [PAGE_SIZE + 1],
+        )
+        rows = cur.fetchall()
+    return [r[:6] for r in rows], [tuple(r[6:]) for r in rows]
 
 
-def _compact_json(x, limit=2000):
-    obj = _safe_json(x)
-    try:
-        s = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
-    except Exception:
-        s = str(obj)
-    return s if len(s) <= limit else (s[:limit] + "…")
+GRUPOS = ()
 
 
 def render(_df, _USUARIOS):
@@ -43,26 +126,27 @@ def render(_df, _USUARIOS):
     if K_PAGE not in st.session_state:
         st.session_state[K_PAGE] = 0
 
+    filtros = _render_filtros()
+    if st.session_state.get(K_FILTROS) != filtros:
+        st.session_state[K_FILTROS] = filtros
+        st.session_state[K_CURSORS] = []
+        st.session_state[K_PAGE] = 0
+
+    cursores = st.session_state.setdefault(K_CURSORS, [])
     page = int(st.session_state[K_PAGE])
-    if page < 0:
+    if page < 0 or page > len(cursores):
+        # sem cursor pra essa página (ex.: sessão nova): recomeça do topo
         page = 0
         st.session_state[K_PAGE] = 0
 
     offset = page * PAGE_SIZE
 
+    # eventos ainda na fila do processo entram antes da listagem
+    audit_flush()
+
     # Puxa 31 pra saber se existe próxima página
     with db_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                select ts, actor_login, action, entity, entity_id, metadata
-                from public.audit_log
-                order by ts desc
-                limit %s offset %s
-                """,
-                (PAGE_SIZE + 1, offset),
-            )
-            rows = cur.fetchall()
+        rows, chaves = _fetch_page(conn, filtros, cursores[page - 1] if page > 0 else None)
 
     has_next = len(rows) > PAGE_SIZE
     if has_next:
@@ -81,7 +165,6 @@ def render(_df, _USUARIOS):
 
     # UTC -> SP, e tira tz pra formatar bonito no Streamlit
     df["ts"] = pd.to_datetime(df["ts"], utc=True, errors="coerce").dt.tz_convert(TZ_LOCAL).dt.tz_localize(None)
-    df["metadata"] = df["metadata"].apply(_compact_json)
 
     # Grid
     st.dataframe(
@@ -111,14 +194,16 @@ def render(_df, _USUARIOS):
     with mid:
         start_n = offset + 1
         end_n = offset + len(df)
+        total = "" if filtros else f" de ~{approx_count('audit_log')}"
         st.markdown(
             f"<div style='text-align:center; padding-top:6px;'>"
-            f"<b>Página {page + 1}</b> — mostrando {start_n} a {end_n}"
+            f"<b>Página {page + 1}</b> — mostrando {start_n} a {end_n}{total}"
             f"</div>",
             unsafe_allow_html=True,
         )
 
     with right:
         if st.button("➡️", use_container_width=True, disabled=(not has_next)):
+            st.session_state[K_CURSORS] = cursores[:page] + [chaves[PAGE_SIZE - 1]]
             st.session_state[K_PAGE] = page + 1
             st.rerun()
@@ -1,12 +1,18 @@
 import streamlit as st
 import pandas as pd
 
+from utils import fatiar_mes
+
+
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("🚫 Quem NÃO atuou no mês atual")
 
     if "uuid" not in df.columns:
         if "id_da_pessoa_entregadora" in df.columns:
-            df["uuid"] = df["id_da_pessoa_entregadora"].astype(str)
+            df["uuid"] = df["id_da_pessoa_entregadora"].fillna("").astype(str)
         else:
             df["uuid"] = ""
 
@@ -34,7 +40,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
                                 help="Mostra quem atuou em QUALQUER um desses meses e não atuou no mês atual.")
 
     def _ativos(df_base, mes, ano):
-        d = df_base[(df_base["mes"] == mes) & (df_base["ano"] == ano)].copy()
+        d = fatiar_mes(df_base, ano, mes)
         if d.empty: return set()
         soma = (
             pd.to_numeric(d.get("segundos_abs", 0), errors="coerce").fillna(0)
@@ -45,8 +51,8 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
         d = d.loc[soma > 0]
         if d.empty: return set()
         if "uuid" not in d.columns and "id_da_pessoa_entregadora" in d.columns:
-            d["uuid"] = d["id_da_pessoa_entregadora"].astype(str)
-        d["uuid"] = d["uuid"].astype(str)
+            d["uuid"] = d["id_da_pessoa_entregadora"].fillna("").astype(str)
+        d["uuid"] = d["uuid"].fillna("").astype(str)
         d = d[["pessoa_entregadora","uuid"]].dropna(subset=["pessoa_entregadora"]).drop_duplicates()
         return set(zip(d["pessoa_entregadora"], d["uuid"]))
 
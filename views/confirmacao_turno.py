@@ -6,6 +6,8 @@ from datetime import datetime, time
 import pandas as pd
 import streamlit as st
 
+from data_loader import catalogo_dimensoes
+
 # ------------------------------------------------------------
 # CONFIG / REGRAS
 # ------------------------------------------------------------
@@ -157,14 +159,16 @@ def _render_context_selectors(df: pd.DataFrame):
     """Seletores reaproveitando a base (praça/sub/turno) + data/hora."""
     cols = list(df.columns) if df is not None else []
 
+    catalogo = catalogo_dimensoes(df) if df is not None else None
+
     praca_opts = []
-    if df is not None and "praca" in cols:
-        praca_opts = sorted([x for x in df["praca"].dropna().unique().tolist()])
+    if catalogo is not None and "praca" in cols:
+        praca_opts = catalogo["pracas"]
 
     turno_col = _pick_col(cols, ["turno", "tipo_turno", "periodo"])
     turno_opts = []
-    if df is not None and turno_col:
-        turno_opts = sorted([x for x in df[turno_col].dropna().unique().tolist()])
+    if catalogo is not None and turno_col:
+        turno_opts = catalogo["turnos"].get(turno_col, [])
 
     c1, c2, c3 = st.columns([1.2, 1.6, 1.2])
 
@@ -258,6 +262,11 @@ def _to_xlsx_bytes(df_registros: pd.DataFrame) -> bytes:
 # ------------------------------------------------------------
 # STREAMLIT PAGE
 # ------------------------------------------------------------
+
+
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("📄 Confirmação de Turno — XLSX organizado")
     st.caption(
@@ -4,6 +4,8 @@ import re
 import pandas as pd
 import streamlit as st
 
+from data_loader import catalogo_dimensoes
+
 REGION_ID_SP = "3841c245-fac1-40a6-8b8f-8d6876447a6d"
 
 SUB_IDS_SP = [
@@ -117,6 +119,9 @@ def _show_parse_feedback(parsed: dict, titulo: str, require_confirm_key: str | N
     return True
 
 
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("📦 Exportar CSV — Elegibilidade & Prioridade")
 
@@ -235,18 +240,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     # 4) DIAGNÓSTICO COM A BASE
     # =========================================================
     if df is not None and not df.empty and "uuid" in df.columns:
-        base_ids = (
-            df["uuid"]
-            .astype(str)
-            .fillna("")
-            .str.strip()
-            .str.lower()
-            .replace({"": None})
-            .dropna()
-            .unique()
-            .tolist()
-        )
-        base_set = set(base_ids)
+        base_set = catalogo_dimensoes(df)["uuids"]
         in_base = sum(1 for d in final_drivers if d in base_set)
         st.caption(
             f"Diagnóstico: **{in_base}/{len(final_drivers)}** IDs da lista final aparecem na base carregada "
@@ -3,6 +3,8 @@ import pandas as pd
 from io import BytesIO
 import re
 
+from data_loader import carregar_mes, meses_disponiveis
+
 META_ELITE = 300
 COL_ELITE = "numero_de_pedidos_aceitos_e_concluidos"
 
@@ -57,11 +59,11 @@ def _ensure_mes_ano(d: pd.DataFrame) -> pd.DataFrame:
 def _ensure_uuid(d: pd.DataFrame) -> pd.DataFrame:
     d = d.copy()
     if "uuid" in d.columns:
-        d["uuid"] = d["uuid"].astype(str)
+        d["uuid"] = d["uuid"].fillna("").astype(str)
         return d
 
     if "id_da_pessoa_entregadora" in d.columns:
-        d["uuid"] = d["id_da_pessoa_entregadora"].astype(str)
+        d["uuid"] = d["id_da_pessoa_entregadora"].fillna("").astype(str)
         return d
 
     d["uuid"] = ""
@@ -77,32 +79,15 @@ def _to_xlsx_bytes(df: pd.DataFrame, sheet_name: str = "ELITE"):
     return out.getvalue()
 
 
-def render(df: pd.DataFrame, _USUARIOS: dict):
-    st.header("🏆 ELITE do mês")
-
-    if df is None or df.empty:
-        st.info("Sem dados.")
-        return
-
-    if COL_ELITE not in df.columns:
-        st.error(f"Coluna obrigatória não encontrada: `{COL_ELITE}`")
-        return
-
-    if "pessoa_entregadora" not in df.columns:
-        st.error("Coluna `pessoa_entregadora` não encontrada.")
-        return
-
-    try:
-        d = _ensure_mes_ano(df)
-    except ValueError as e:
-        st.error(str(e))
-        return
+GRUPOS = ()
+# escopo mensal: main não carrega o histórico, a página busca só o mês
+CARREGA_BASE = False
 
-    d = _ensure_uuid(d)
 
-    d[COL_ELITE] = pd.to_numeric(d[COL_ELITE], errors="coerce").fillna(0)
+def render(_df, _USUARIOS: dict):
+    st.header("🏆 ELITE do mês")
 
-    meses = sorted([m for m in d["mes_ano"].dropna().unique().tolist()])
+    meses = meses_disponiveis()
     if not meses:
         st.info("Sem meses válidos na base.")
         return
@@ -114,11 +99,30 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
         format_func=_fmt_mes,
     )
 
-    d_mes = d[d["mes_ano"] == pd.to_datetime(mes_sel)].copy()
+    mes_ts = pd.to_datetime(mes_sel)
+    d_mes = carregar_mes(mes_ts.year, mes_ts.month, grupos=GRUPOS)
     if d_mes.empty:
         st.info("Sem dados no mês selecionado.")
         return
 
+    if COL_ELITE not in d_mes.columns:
+        st.error(f"Coluna obrigatória não encontrada: `{COL_ELITE}`")
+        return
+
+    if "pessoa_entregadora" not in d_mes.columns:
+        st.error("Coluna `pessoa_entregadora` não encontrada.")
+        return
+
+    try:
+        d_mes = _ensure_mes_ano(d_mes)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    d_mes = _ensure_uuid(d_mes)
+
+    d_mes[COL_ELITE] = pd.to_numeric(d_mes[COL_ELITE], errors="coerce").fillna(0)
+
     # Tabela base (lista completa)
     base = (
         d_mes.groupby(["uuid", "pessoa_entregadora"], as_index=False)[COL_ELITE]
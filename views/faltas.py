@@ -3,11 +3,15 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
+
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("⚠️ Entregadores com 3+ faltas consecutivas")
 
     # ------ Normaliza data ------
-    df = df.copy()
+    df = df.copy(deep=False)
     if "data" in df.columns:
         df["data"] = pd.to_datetime(df["data"], errors="coerce").dt.date
     elif "data_do_periodo" in df.columns:
@@ -26,7 +30,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     corte_60d = hoje - timedelta(days=60)
     corte_15d = hoje - timedelta(days=15)
 
-    df_janela = df[df["data"] >= corte_60d].copy()
+    df_janela = df[df["data"] >= corte_60d]
     if df_janela.empty:
         st.success("✅ Nada na janela dos últimos 60 dias.")
         return
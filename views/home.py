@@ -161,6 +161,8 @@ def _render_home_cards():
     )
 
 
+GRUPOS = ()
+
 
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.markdown(
@@ -3,8 +3,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from relatorios import utr_por_entregador_turno
-from shared import sub_options_with_livre, apply_sub_filter  # 👈 filtro por subpraça
-from utils import calcular_aderencia, mask_entregador_ativo, entregador_key
+from data_loader import catalogo_dimensoes, derivado, totais_mensais
+from shared import apply_sub_filter  # 👈 filtro por subpraça
+from utils import calcular_aderencia, mask_entregador_ativo, entregador_key, fatiar_mes
 
 PRIMARY_COLOR = ["#00BFFF"]  # paleta padrão
 
@@ -437,6 +438,41 @@ def _utr_media_mensal(df: pd.DataFrame, mes: int, ano: int) -> float:
     return float((base["corridas_ofertadas"] / base["supply_hours"]).mean())
 
 
+_SOMAS_MENSAIS = [
+    "numero_de_corridas_ofertadas",
+    "numero_de_corridas_aceitas",
+    "numero_de_corridas_rejeitadas",
+    "numero_de_corridas_completadas",
+    "segundos_abs",
+]
+
+
+def _somas_mensais(df: pd.DataFrame, sub_sel, turno_col, turno_sel, ent_sel) -> pd.DataFrame:
+    """
+    Somas por mes_ano pros gráficos mensais. Agrega no Postgres (cache por
+    filtro + versão) quando dá; senão (RAW em texto / coluna de turno que
+    não é 'periodo') faz o groupby em memória sobre o df já filtrado, em
+    cache por filtro + versão da base (df.attrs["versao"]).
+    """
+    turno = turno_sel if (turno_sel and turno_sel != "Todos") else None
+    if turno is None or turno_col == "periodo":
+        tot = totais_mensais(sub_sel, turno, ent_sel)
+        if tot is not None:
+            return tot
+    versao = df.attrs.get("versao")
+    if versao is None:
+        return df.groupby("mes_ano", as_index=False)[_SOMAS_MENSAIS].sum()
+    return derivado(
+        "indicadores.somas_mensais",
+        (tuple(sorted(sub_sel or ())), turno_col, turno, tuple(sorted(ent_sel or ()))),
+        lambda: df.groupby("mes_ano", as_index=False)[_SOMAS_MENSAIS].sum(),
+        versao=versao,
+    )
+
+
+GRUPOS = ("escala",)
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("📊 Indicadores Gerais")
 
@@ -497,12 +533,13 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     col_f1, col_f2, col_f3 = st.columns([1, 1, 2])
 
     # Subpraça (com 'LIVRE' quando praca=SAO PAULO e sub_praca nulo)
-    sub_opts = sub_options_with_livre(df, praca_scope="SAO PAULO")
+    sub_opts = catalogo_dimensoes(df)["sub_pracas"]
     sub_sel = col_f1.multiselect("Subpraça", sub_opts)
     df = apply_sub_filter(df, sub_sel, praca_scope="SAO PAULO")
 
     # Turno (se existir)
     turno_col = next((c for c in ("turno", "tipo_turno", "periodo") if c in df.columns), None)
+    turno_sel = "Todos"
     if turno_col is not None:
         op_turno = ["Todos"] + sorted(df[turno_col].dropna().unique().tolist())
         turno_sel = col_f2.selectbox("Turno", op_turno, index=0)
@@ -545,7 +582,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     cmp_start = month_start - pd.Timedelta(days=6)
     cmp_end = month_end + pd.Timedelta(days=6)
 
-    df_mes_ref = df[(df["mes"] == mes_diario) & (df["ano"] == ano_diario)].copy()
+    df_mes_ref = fatiar_mes(df, ano_diario, mes_diario).copy()
     df_ano_ref = df[df["ano"] == ano_diario].copy()
 
     # Base estendida só pra comparativos semanais (pra completar Seg–Dom quando a semana cruza mês)
@@ -701,7 +738,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     # ---------------------------------------------------------
     if tipo_grafico == "Horas realizadas":
         mensal_horas = (
-            df.groupby("mes_ano", as_index=False)["segundos_abs"].sum()
+            _somas_mensais(df, sub_sel, turno_col, turno_sel, ent_sel)[["mes_ano", "segundos_abs"]]
               .assign(horas=lambda d: d["segundos_abs"] / 3600.0)
         )
         mensal_horas["mes_rotulo"] = pd.to_datetime(mensal_horas["mes_ano"]).dt.strftime("%b/%y")
@@ -833,12 +870,14 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     col, titulo, label = col_map[tipo_grafico]
 
     # ---------- Mensal ----------
-    mensal = df.groupby("mes_ano", as_index=False)[col].sum().rename(columns={col: "valor"})
+    # somas do mês vêm prontas do banco (poucas linhas), não do histórico em memória
+    somas = _somas_mensais(df, sub_sel, turno_col, turno_sel, ent_sel)
+    mensal = somas[["mes_ano", col]].rename(columns={col: "valor"})
     mensal["mes_rotulo"] = pd.to_datetime(mensal["mes_ano"]).dt.strftime("%b/%y")
 
     if tipo_grafico == "Corridas ofertadas":
         # Horas por mês
-        secs_mensal = df.groupby("mes_ano", as_index=False)["segundos_abs"].sum().rename(columns={"segundos_abs": "segundos"})
+        secs_mensal = somas[["mes_ano", "segundos_abs"]].rename(columns={"segundos_abs": "segundos"})
         mensal = mensal.merge(secs_mensal, on="mes_ano", how="left")
         mensal["segundos"] = pd.to_numeric(mensal.get("segundos", 0), errors="coerce").fillna(0)
         mensal["horas"] = mensal["segundos"] / 3600.0
@@ -855,21 +894,21 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
         # Label no formato: "N (x.xx UTR)"
         mensal["label"] = mensal.apply(lambda r: f"{int(r['valor'])} ({r['utr']:.2f} UTR)", axis=1)
     elif tipo_grafico == "Corridas aceitas":
-        ref = df.groupby("mes_ano", as_index=False)["numero_de_corridas_ofertadas"].sum().rename(
+        ref = somas[["mes_ano", "numero_de_corridas_ofertadas"]].rename(
             columns={"numero_de_corridas_ofertadas": "ref"}
         )
         mensal = mensal.merge(ref, on="mes_ano", how="left")
         mensal["pct"] = (mensal["valor"] / mensal["ref"] * 100).where(mensal["ref"] > 0, 0.0)
         mensal["label"] = mensal.apply(lambda r: (f"{r['pct']:.1f}% ({int(r['valor'])})" if modo_taxa == "%" else f"{int(r['valor'])} ({r['pct']:.1f}%)"), axis=1)
     elif tipo_grafico == "Corridas rejeitadas":
-        ref = df.groupby("mes_ano", as_index=False)["numero_de_corridas_ofertadas"].sum().rename(
+        ref = somas[["mes_ano", "numero_de_corridas_ofertadas"]].rename(
             columns={"numero_de_corridas_ofertadas": "ref"}
         )
         mensal = mensal.merge(ref, on="mes_ano", how="left")
         mensal["pct"] = (mensal["valor"] / mensal["ref"] * 100).where(mensal["ref"] > 0, 0.0)
         mensal["label"] = mensal.apply(lambda r: (f"{r['pct']:.1f}% ({int(r['valor'])})" if modo_taxa == "%" else f"{int(r['valor'])} ({r['pct']:.1f}%)"), axis=1)
     elif tipo_grafico == "Corridas completadas":
-        ref = df.groupby("mes_ano", as_index=False)["numero_de_corridas_aceitas"].sum().rename(
+        ref = somas[["mes_ano", "numero_de_corridas_aceitas"]].rename(
             columns={"numero_de_corridas_aceitas": "ref"}
         )
         mensal = mensal.merge(ref, on="mes_ano", how="left")
@@ -98,10 +98,14 @@ def _style_status(val):
 #   VIEW PRINCIPAL
 # ------------------------------ #
 
+
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("💸 Adicional por Turno — Lista por período (com DATA)")
 
-    base = df.copy()
+    base = df.copy(deep=False)
 
     # ---------------------- #
     # Normaliza data
@@ -131,7 +135,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
         format="DD/MM/YYYY"
     )
 
-    df_periodo = base.copy()
+    df_periodo = base.copy(deep=False)
     if len(periodo) == 2:
         ini = pd.to_datetime(periodo[0])
         fim = pd.to_datetime(periodo[1]) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
@@ -167,7 +171,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
         st.caption("Selecione o período e clique em **Gerar lista**.")
         return
 
-    df_filtrado = df_periodo.copy()
+    df_filtrado = df_periodo.copy(deep=False)
     if filtro_nomes:
         df_filtrado = df_filtrado[df_filtrado["pessoa_entregadora"].isin(filtro_nomes)]
     if filtro_turnos:
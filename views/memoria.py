@@ -0,0 +1,48 @@
+import streamlit as st
+
+from auth import require_admin
+from data_loader import erro_base, relatorio_memoria
+
+
+def _rss_mib():
+    """RSS atual do worker (Linux). Fora do Linux devolve None."""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except Exception:
+        pass
+    return None
+
+
+GRUPOS = ()
+
+
+def render(_df, _USUARIOS):
+    require_admin()
+    st.markdown("# 🧠 Memória da base")
+
+    erro = erro_base()
+    if erro:
+        st.error(f"Última recarga da base em background falhou (servindo a versão anterior): {erro}")
+
+    rel = relatorio_memoria()
+    if rel is None:
+        st.info("Base ainda não carregada neste processo.")
+        return
+
+    total = rel["bytes"].sum() / (1024 * 1024)
+    rss = _rss_mib()
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Base em memória", f"{total:,.1f} MiB")
+    c2.metric("Colunas", len(rel))
+    c3.metric("RSS do processo", f"{rss:,.0f} MiB" if rss is not None else "—")
+
+    st.caption("Uso real por coluna (memory_usage deep=True) da base compartilhada deste worker.")
+    st.dataframe(
+        rel[["coluna", "dtype", "MiB", "%"]],
+        use_container_width=True,
+        hide_index=True,
+    )
@@ -74,6 +74,9 @@ def _toggle(label: str, value: bool, key: str):
     return st.checkbox(label, value=value, key=key)
 
 
+GRUPOS = ()
+
+
 def render(_df, _USUARIOS):
     my_user_id = st.session_state.get("user_id")
     if not my_user_id:
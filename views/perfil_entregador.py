@@ -3,6 +3,7 @@ import pandas as pd
 import plotly.express as px
 from relatorios import utr_por_entregador_turno
 from shared import hms_from_hours
+from data_loader import catalogo_dimensoes, linhas_entregador
 
 META_ELITE = 300
 COL_ELITE = "numero_de_pedidos_aceitos_e_concluidos"
@@ -14,6 +15,9 @@ def _safe_num_sum(df: pd.DataFrame, col: str) -> float:
     return float(pd.to_numeric(df[col], errors="coerce").fillna(0).sum())
 
 
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("👤 Perfil do Entregador")
 
@@ -25,7 +29,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
         st.error("Coluna `pessoa_entregadora` não encontrada na base.")
         return
 
-    nomes = sorted(df["pessoa_entregadora"].dropna().unique())
+    nomes = catalogo_dimensoes(df)["entregadores"]
     nome = st.selectbox(
         "Selecione o entregador:",
         [None] + nomes,
@@ -34,7 +38,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     if not nome:
         return
 
-    df_e = df[df["pessoa_entregadora"] == nome].copy()
+    df_e = linhas_entregador(df, nome=nome).copy()
     if df_e.empty:
         st.info("❌ Nenhum dado para esse entregador no histórico.")
         return
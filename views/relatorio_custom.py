@@ -1,20 +1,26 @@
 import streamlit as st
 import pandas as pd
-from shared import sub_options_with_livre, apply_sub_filter
+from shared import apply_sub_filter
 from relatorios import gerar_dados
+from data_loader import catalogo_dimensoes, linhas_entregador
+
+
+GRUPOS = ()
+
 
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("Relatório Customizado do Entregador")
 
-    entregadores_lista = sorted(df["pessoa_entregadora"].dropna().unique())
+    catalogo = catalogo_dimensoes(df)
+    entregadores_lista = catalogo["entregadores"]
     entregador = st.selectbox("🔎 Selecione o entregador:", [None] + entregadores_lista,
                               format_func=lambda x: "" if x is None else x)
 
-    subpracas = sub_options_with_livre(df, praca_scope="SAO PAULO")
+    subpracas = catalogo["sub_pracas"]
     filtro_subpraca = st.multiselect("Filtrar por subpraça:", subpracas)
 
     if "periodo" in df.columns:
-        turnos = sorted(df["periodo"].dropna().unique())
+        turnos = catalogo["turnos"]["periodo"]
         filtro_turno = st.multiselect("Filtrar por turno:", turnos)
     else:
         filtro_turno = []
@@ -44,7 +50,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
     gerar_custom = st.button("Gerar relatório customizado", use_container_width=True)
 
     if gerar_custom and entregador:
-        df_filt = df[df["pessoa_entregadora"] == entregador]
+        df_filt = linhas_entregador(df, nome=entregador)
         df_filt = apply_sub_filter(df_filt, filtro_subpraca, praca_scope="SAO PAULO")
         if filtro_turno:
             df_filt = df_filt[df_filt["periodo"].isin(filtro_turno)]
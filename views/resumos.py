@@ -11,6 +11,9 @@ from shared import sub_options_with_livre, apply_sub_filter  # mesmo esquema do
 DOW_LABELS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]  # weekday(): seg=0
 
 
+GRUPOS = ("escala",)
+
+
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("🧾 Resumo (Mensal/Semanal/Diário)")
 
@@ -1,7 +1,7 @@
 # views/meu_modo.py
 import streamlit as st
 import pandas as pd
-from utils import calcular_tempo_online
+from utils import calcular_tempo_online, indices_por_valor
 
 def _fmt_pct(x: float) -> str:
     try:
@@ -53,12 +53,16 @@ def _bloco_whatsapp(nome: str, df_chunk: pd.DataFrame) -> str:
     ]
     return "\n".join(linhas)
 
+
+GRUPOS = ()
+
+
 def render(df: pd.DataFrame, USUARIOS: dict):
     # --- liberado para todos ---
     st.header("Relatório de saídas")
 
     # normaliza data
-    base = df.copy()
+    base = df.copy(deep=False)
     if "data" in base.columns:
         base["data"] = pd.to_datetime(base["data"], errors="coerce")
     elif "data_do_periodo" in base.columns:
@@ -90,7 +94,7 @@ def render(df: pd.DataFrame, USUARIOS: dict):
         return
 
     # aplica período
-    df_filtrado = base.copy()
+    df_filtrado = base.copy(deep=False)
     if len(periodo) == 2:
         ini, fim = pd.to_datetime(periodo[0]), pd.to_datetime(periodo[1]) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
         df_filtrado = df_filtrado[(df_filtrado["data"] >= ini) & (df_filtrado["data"] <= fim)]
@@ -100,8 +104,9 @@ def render(df: pd.DataFrame, USUARIOS: dict):
 
     # monta blocos
     blocos = []
+    pos = indices_por_valor(df_filtrado, "pessoa_entregadora")
     for nome in sel:
-        chunk = df_filtrado[df_filtrado["pessoa_entregadora"] == nome].copy()
+        chunk = df_filtrado.iloc[pos.get(nome, [])].copy()
         texto = _bloco_whatsapp(nome, chunk)
         blocos.append(texto)
 
@@ -1,13 +1,19 @@
 import streamlit as st
-import pandas as pd
 from relatorios import gerar_simplicado
+from data_loader import carregar_mes, entregadores_disponiveis, meses_disponiveis
 
 
-def render(df: pd.DataFrame, _USUARIOS: dict):
+GRUPOS = ()
+# escopo mensal: main não carrega o histórico, a página busca só os 2 meses
+CARREGA_BASE = False
+
+
+def render(_df, _USUARIOS: dict):
     st.header("Desempenho do Entregador — Simplificada (WhatsApp)")
 
     # lista de entregadores
-    nomes = sorted(df["pessoa_entregadora"].dropna().unique())
+    nomes = entregadores_disponiveis()
+    anos = sorted({int(m.year) for m in meses_disponiveis()}, reverse=True)
 
     with st.form("simp"):
         # seleção de entregador
@@ -21,11 +27,11 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
 
         # primeiro mês/ano
         mes1 = col1.selectbox("1º Mês:", list(range(1, 13)), index=0)
-        ano1 = col2.selectbox("1º Ano:", sorted(df["ano"].unique(), reverse=True))
+        ano1 = col2.selectbox("1º Ano:", anos)
 
         # segundo mês/ano
         mes2 = col1.selectbox("2º Mês:", list(range(1, 13)), index=1)
-        ano2 = col2.selectbox("2º Ano:", sorted(df["ano"].unique(), reverse=True))
+        ano2 = col2.selectbox("2º Ano:", anos)
 
         gerar = st.form_submit_button("Gerar", use_container_width=True)
 
@@ -33,8 +39,8 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
         return
 
     # gera blocos por mês (sem repetir o nome dentro do texto)
-    t1 = gerar_simplicado(nome, mes1, ano1, df)
-    t2 = gerar_simplicado(nome, mes2, ano2, df)
+    t1 = gerar_simplicado(nome, mes1, ano1, carregar_mes(ano1, mes1, grupos=GRUPOS))
+    t2 = gerar_simplicado(nome, mes2, ano2, carregar_mes(ano2, mes2, grupos=GRUPOS))
 
     blocos = [t for t in [t1, t2] if t]
 
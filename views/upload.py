@@ -7,9 +7,17 @@ from datetime import datetime, timezone
 
 import streamlit as st
 import pandas as pd
-import psycopg
 
-from db import get_dsn, ensure_import_columns, audit_log
+from db import (
+    get_conn,
+    put_conn,
+    ensure_import_columns,
+    sync_import,
+    table_columns,
+    audit_log,
+)
+from data_loader import invalidar_base
+from db_bootstrap import ensure_indexes_in_background
 
 
 RAW_TABLE = "base_2025_raw"
@@ -53,31 +61,6 @@ def _sha256(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
-def _table_exists(cur, table: str) -> bool:
-    cur.execute(
-        """
-        select 1 from information_schema.tables
-        where table_schema='public' and table_name=%s
-        limit 1
-        """,
-        (table,),
-    )
-    return cur.fetchone() is not None
-
-
-def _get_columns(cur, table: str) -> list[str]:
-    cur.execute(
-        """
-        select column_name
-        from information_schema.columns
-        where table_schema='public' and table_name=%s
-        order by ordinal_position
-        """,
-        (table,),
-    )
-    return [r[0] for r in cur.fetchall()]
-
-
 def _parse_file_date(filename: str):
     """
     Tenta extrair YYYY-MM-DD do nome do arquivo (ex: 2026-02-10.csv).
@@ -93,7 +76,7 @@ def _parse_file_date(filename: str):
 
 
 def _imports_lookup(cur, filename: str, sha: str):
-    cols = set(_get_columns(cur, IMPORTS_TABLE))
+    cols = set(table_columns(cur, IMPORTS_TABLE))
 
     # se tiver hash no schema, usa ele (mantém o comportamento antigo)
     if "sha256" in cols:
@@ -129,7 +112,7 @@ def _imports_lookup(cur, filename: str, sha: str):
 
 
 def _imports_insert(cur, filename: str, sha: str, row_count_guess: int):
-    cols = set(_get_columns(cur, IMPORTS_TABLE))
+    cols = set(table_columns(cur, IMPORTS_TABLE))
     fields, params, values = [], [], []
 
     # ✅ FIX PRINCIPAL: teu schema exige file_name NOT NULL
@@ -177,6 +160,9 @@ def _imports_insert(cur, filename: str, sha: str, row_count_guess: int):
     return int(cur.fetchone()[0])
 
 
+GRUPOS = ()
+
+
 def render(_df, _USUARIOS):
     st.markdown("# 📥 Importar CSV")
     st.caption(f"Destino fixo: public.{RAW_TABLE} | Controle: public.{IMPORTS_TABLE}")
@@ -199,13 +185,24 @@ def render(_df, _USUARIOS):
     if not st.button("🚀 Importar agora", use_container_width=True):
         return
 
-    dsn = get_dsn()
-    conn = psycopg.connect(dsn, connect_timeout=10)
+    conn = get_conn()
     conn.autocommit = False
 
     try:
         # garante colunas de importador
         ensure_import_columns(conn)
+        # tipada/cubo (DDL + backfill) e índices: bootstrap em background
+        # (main.py / python db_bootstrap.py); aqui só o relatório
+        bootstrap = ensure_indexes_in_background()
+        if bootstrap["erro"]:
+            st.warning(f"Bootstrap do banco (tabela tipada/cubo/índices) falhou: {bootstrap['erro']}")
+        elif bootstrap["relatorio"] is None:
+            st.caption("Tabela tipada/cubo/índices ainda sendo preparados em background.")
+        indices = bootstrap["relatorio"]
+        if indices and indices["criados"]:
+            st.caption(f"Índices criados: {', '.join(indices['criados'])}")
+        if indices and indices["falhas"]:
+            st.warning("Índices não criados: " + "; ".join(indices["falhas"]))
 
         prog = st.progress(0)
         total = len(files)
@@ -220,12 +217,13 @@ def render(_df, _USUARIOS):
 
             try:
                 with conn.cursor() as cur:
-                    if not _table_exists(cur, RAW_TABLE):
+                    # colunas do catálogo do processo (sem information_schema por arquivo)
+                    raw_cols = set(table_columns(cur, RAW_TABLE))
+                    if not raw_cols:
                         raise RuntimeError(f"Tabela public.{RAW_TABLE} não existe.")
-                    if not _table_exists(cur, IMPORTS_TABLE):
+                    if not table_columns(cur, IMPORTS_TABLE):
                         raise RuntimeError(f"Tabela public.{IMPORTS_TABLE} não existe.")
 
-                    raw_cols = set(_get_columns(cur, RAW_TABLE))
                     missing = [h for h in header if h not in raw_cols]
                     if missing:
                         raise RuntimeError(f"CSV tem colunas não existentes na RAW: {', '.join(missing)}")
@@ -272,6 +270,11 @@ def render(_df, _USUARIOS):
                         (import_id,),
                     )
 
+                    # mesma transação: parse PT-BR pago 1x aqui, não a cada carga
+                    # (e o que foi apagado de imports sai da tipada/cubo junto);
+                    # sem a tipada ainda, o backfill do bootstrap pega este import
+                    sync_import(cur, import_id)
+
                 conn.commit()
                 st.success(f"✅ {fname}: {real_rows} linhas (import_id={import_id})")
                 audit_log("import_csv_done", "imports", str(import_id), {"filename": fname, "rows": real_rows})
@@ -284,13 +287,9 @@ def render(_df, _USUARIOS):
             prog.progress(int(i / total * 100))
 
     finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
-
-    # refresh geral
-    st.session_state.force_refresh = True
-    st.session_state.just_refreshed = True
-    st.cache_data.clear()
+        put_conn(conn)
+
+    # base nova: o loader confere a versão e traz só os imports novos
+    # (em background). Os outros caches do app ficam como estão.
+    invalidar_base()
     st.success("Importação finalizada. Volta no Início — já tá no banco.")
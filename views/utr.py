@@ -3,6 +3,7 @@ import pandas as pd
 import plotly.express as px
 from relatorios import utr_por_entregador_turno
 from shared import is_absoluto, is_medias, sub_options_with_livre, apply_sub_filter, hms_from_hours
+from data_loader import carregar_cubo_mes, meses_disponiveis
 
 def _serie_diaria(base_plot: pd.DataFrame, metodo: str) -> pd.DataFrame:
     if base_plot.empty:
@@ -20,20 +21,32 @@ def _serie_diaria(base_plot: pd.DataFrame, metodo: str) -> pd.DataFrame:
     agg["utr_val"] = agg.apply(lambda r: (r["ofertadas"]/r["horas"]) if r["horas"]>0 else 0.0, axis=1)
     return agg[["dia_num","utr_val"]].sort_values("dia_num")
 
-def render(df: pd.DataFrame, _USUARIOS: dict):
+
+GRUPOS = ()
+# escopo mensal: main não carrega o histórico, a página busca só o mês
+CARREGA_BASE = False
+
+
+def render(_df, _USUARIOS: dict):
     st.header("🧭 UTR – Corridas ofertadas por hora")
+    anos = sorted({int(m.year) for m in meses_disponiveis()}, reverse=True)
+    if not anos:
+        st.info("Sem dados na base.")
+        return
+
     col1, col2 = st.columns(2)
     mes_sel = col1.selectbox("Mês", list(range(1, 13)))
-    ano_sel = col2.selectbox("Ano", sorted(df["ano"].unique(), reverse=True))
+    ano_sel = col2.selectbox("Ano", anos)
 
-    df_mm = df[(df["mes"] == mes_sel) & (df["ano"] == ano_sel)]
-    if "sub_praca" in df.columns:
+    # UTR só soma ofertadas/segundos por dia+turno+entregador: lê o cubo diário
+    df_mm = carregar_cubo_mes(ano_sel, mes_sel)
+    if "sub_praca" in df_mm.columns:
         sub_opts = sub_options_with_livre(df_mm, praca_scope="SAO PAULO")
         sub_sel = st.multiselect("Filtrar por subpraça (opcional):", sub_opts)
     else:
         sub_sel = []
 
-    df_base = apply_sub_filter(df.copy(), sub_sel, praca_scope="SAO PAULO")
+    df_base = apply_sub_filter(df_mm, sub_sel, praca_scope="SAO PAULO")
     base_full = utr_por_entregador_turno(df_base, mes_sel, ano_sel)
     if base_full.empty:
         st.info("Nenhum dado encontrado para o período/filtros.")
@@ -1,11 +1,16 @@
 import streamlit as st
 import pandas as pd
 from relatorios import gerar_dados
+from data_loader import catalogo_dimensoes, linhas_entregador
+
+
+GRUPOS = ()
+
 
 def render(df: pd.DataFrame, _USUARIOS: dict):
     st.header("Desempenho do Entregador — Ver geral")
 
-    nomes = sorted(df["pessoa_entregadora"].dropna().unique())
+    nomes = catalogo_dimensoes(df)["entregadores"]
 
     nome = st.selectbox(
         "🔎 Selecione o entregador:",
@@ -22,7 +27,7 @@ def render(df: pd.DataFrame, _USUARIOS: dict):
             nome,
             None,
             None,
-            df[df["pessoa_entregadora"] == nome]
+            linhas_entregador(df, nome=nome)
         )
 
         st.text_area(